@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from app.data_saver import DataSaverStrategy, safe_symbol
+from app.metrics import metrics
+from app.request_scheduler import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class DownloadJob:
+    exchange: str
+    market_type: str
+    symbol: str
+    timeframe: str
+    start: datetime
+    end: datetime
+    timezone: str = "UTC"
+
+    @property
+    def job_id(self) -> str:
+        return (f"{self.exchange}:{self.market_type}:{self.symbol}:{self.timeframe}:"
+                f"{int(self.start.timestamp() * 1000)}:{int(self.end.timestamp() * 1000)}:{self.timezone}")
+
+    def filename(self, extension: str) -> str:
+        start_str = self.start.strftime('%Y-%m-%d_%H-%M-%S')
+        end_str = self.end.strftime('%Y-%m-%d_%H-%M-%S')
+        symbol = safe_symbol(self.symbol)
+        return f"{self.exchange}_{self.market_type}_{symbol}_{self.timeframe}_{start_str}_{end_str}.{extension}"
+
+
+class BulkDownloader:
+    """
+    Runs many symbol x timeframe downloads on a worker pool, writing each result through a
+    DataSaverStrategy. Finished jobs are recorded in a checkpoint file so a restarted run
+    skips them. The fetcher stores each request window as it completes, so an interrupted job
+    resumes after the last window that reached the candle store.
+    """
+    def __init__(self, fetchers: dict, saver: DataSaverStrategy, output_directory: str,
+                 checkpoint_path: str, workers: int = 4):
+        self.fetchers = fetchers
+        self.saver = saver
+        self.output_directory = output_directory
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers
+        self._checkpoint_lock = threading.Lock()
+
+    @staticmethod
+    def load_manifest(path: str) -> list:
+        """
+        Expands a JSON manifest of the form
+        {"jobs": [{"exchange": "bybit", "market_type": "perpetual", "symbols": ["BTCUSDT"],
+                   "timeframes": ["1h", "4h"], "start": "2024-01-01T00:00:00Z",
+                   "end": "2024-06-01T00:00:00Z", "timezone": "UTC"}]}
+        into one DownloadJob per symbol and timeframe.
+        """
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+
+        jobs = []
+        for entry in manifest.get('jobs', []):
+            start = BulkDownloader._parse_datetime(entry['start'])
+            end = BulkDownloader._parse_datetime(entry['end'])
+            if end <= start:
+                raise ValueError(f"Manifest entry ends before it starts: {entry}")
+            for symbol in entry['symbols']:
+                for timeframe in entry['timeframes']:
+                    jobs.append(DownloadJob(
+                        exchange=entry['exchange'],
+                        market_type=entry.get('market_type', 'spot'),
+                        symbol=symbol.upper(),
+                        timeframe=timeframe,
+                        start=start,
+                        end=end,
+                        timezone=entry.get('timezone', 'UTC')
+                    ))
+        return jobs
+
+    def run(self, jobs: list) -> dict:
+        completed = self._load_checkpoint()
+        pending = [job for job in jobs if job.job_id not in completed]
+        summary = {'skipped': len(jobs) - len(pending), 'completed': 0, 'failed': 0}
+        logger.info("Bulk download: %d jobs, %d already done", len(jobs), summary['skipped'])
+
+        os.makedirs(self.output_directory, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._run_job, job): job for job in pending}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    filepath = future.result()
+                    self._mark_completed(job, filepath)
+                    summary['completed'] += 1
+                    metrics.increment('bulk_jobs', result='completed')
+                    logger.info("Saved %s %s %s to %s", job.exchange, job.symbol, job.timeframe, filepath)
+                except Exception as e:
+                    summary['failed'] += 1
+                    metrics.increment('bulk_jobs', result='failed')
+                    logger.error("Failed %s %s %s: %s", job.exchange, job.symbol, job.timeframe, e)
+        return summary
+
+    def _run_job(self, job: DownloadJob) -> str:
+        if job.exchange not in self.fetchers:
+            raise ValueError(f"Exchange '{job.exchange}' is not supported.")
+
+        fetcher = self.fetchers[job.exchange]
+        with metrics.timer('bulk_job_seconds', exchange=job.exchange):
+            data = fetcher.fetch_ohlcv_range(job.symbol, job.timeframe, job.start, job.end,
+                                             ZoneInfo(job.timezone), job.market_type, priority=BACKGROUND)
+        if data.empty:
+            raise ValueError("No data returned from the exchange for the requested range.")
+
+        metadata = {
+            'exchange': job.exchange,
+            'market_type': job.market_type,
+            'symbol': job.symbol,
+            'timeframe': job.timeframe,
+            'timezone': job.timezone
+        }
+        filepath = self.saver.destination(self.output_directory, job.filename(self.saver.extension), metadata)
+        self.saver.save(data, filepath, metadata)
+        if not os.path.exists(filepath):
+            raise IOError(f"Saver did not write {filepath}")
+        return filepath
+
+    def _load_checkpoint(self) -> dict:
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r') as f:
+            return json.load(f).get('completed', {})
+
+    def _mark_completed(self, job: DownloadJob, filepath: str):
+        with self._checkpoint_lock:
+            completed = self._load_checkpoint()
+            completed[job.job_id] = filepath
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'completed': completed}, f, indent=2)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    @staticmethod
+    def _parse_datetime(value: str) -> datetime:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc)
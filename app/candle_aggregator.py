@@ -0,0 +1,60 @@
+import math
+import numpy as np
+import pandas as pd
+
+def aggregate_candles(data: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """
+    Merges every 'factor' consecutive rows into one candle.
+    """
+    if factor <= 1 or data.empty:
+        return data
+    return aggregate_groups(data, np.arange(0, len(data), factor))
+
+def aggregate_groups(data: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+    """
+    Merges the rows from each index in 'starts' up to the next one into one candle: first open,
+    highest high, lowest low, last close and summed volume. Indicator columns keep the last value
+    of each bucket, so their lines stay aligned with the aggregated closes.
+    """
+    ends = np.append(starts[1:], len(data)) - 1
+
+    aggregated = {}
+    for col in data.columns:
+        if col == 'date':
+            # .array keeps a timezone-aware column as datetimes instead of boxing them into objects
+            aggregated[col] = data[col].array[starts]
+            continue
+        values = data[col].to_numpy()
+        if col == 'open':
+            aggregated[col] = values[starts]
+        elif col == 'high':
+            aggregated[col] = np.fmax.reduceat(values, starts)
+        elif col == 'low':
+            aggregated[col] = np.fmin.reduceat(values, starts)
+        elif col == 'volume':
+            aggregated[col] = np.add.reduceat(np.nan_to_num(values.astype(float)), starts)
+        else:
+            aggregated[col] = values[ends]
+    return pd.DataFrame(aggregated)
+
+def downsample_factor(row_count: int, max_bars: int) -> int:
+    return max(1, math.ceil(row_count / max_bars))
+
+def downsample_candles(data: pd.DataFrame, max_bars: int) -> pd.DataFrame:
+    return aggregate_candles(data, downsample_factor(len(data), max_bars))
+
+def aggregate_chunks(chunks, factor: int):
+    """
+    Aggregates a stream of DataFrame chunks without holding them all in memory. Rows left over
+    at the end of a chunk are carried into the next one so buckets never straddle chunks.
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None and not carry.empty:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        usable = len(chunk) - len(chunk) % factor
+        if usable:
+            yield aggregate_candles(chunk.iloc[:usable], factor)
+        carry = chunk.iloc[usable:]
+    if carry is not None and not carry.empty:
+        yield aggregate_candles(carry, factor)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+class CandleBuffer:
+    """
+    Candles in contiguous NumPy arrays allocated once: open times as int64 epoch milliseconds and
+    one row of a (5, capacity) float array per OHLCV column, so each column is contiguous. Pages
+    from the exchange are written in place, and DataFrames built from the buffer share its
+    memory instead of copying it. 'dtype' can be float32 to halve the memory of the prices.
+    """
+    def __init__(self, capacity: int, dtype=np.float64):
+        self.dates = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty((len(VALUE_COLUMNS), capacity), dtype=dtype)
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def capacity(self) -> int:
+        return len(self.dates)
+
+    def write(self, position: int, page: list, end: int = None, max_rows: int = None) -> int:
+        """
+        Writes a ccxt OHLCV page ([timestamp, open, high, low, close, volume] rows in ascending
+        order) at 'position', skipping candles opening at or after 'end'. Returns the rows written.
+        """
+        if not page:
+            return 0
+        rows = np.asarray(page, dtype=np.float64)
+        count = len(rows) if end is None else int(np.searchsorted(rows[:, 0], end))
+        count = min(count, self.capacity - position, max_rows if max_rows is not None else count)
+        self.dates[position:position + count] = rows[:count, 0]
+        self.values[:, position:position + count] = rows[:count, 1:6].T
+        self.length = max(self.length, position + count)
+        return count
+
+    def compact(self, segments: list):
+        """
+        Moves the (position, count) segments, filled in any order by write(), to the front in
+        the order given, and drops repeated timestamps keeping the later candle.
+        """
+        length = 0
+        for position, count in segments:
+            if position != length:
+                self.dates[length:length + count] = self.dates[position:position + count]
+                self.values[:, length:length + count] = self.values[:, position:position + count]
+            length += count
+        self.length = length
+
+        dates = self.dates[:length]
+        repeated = dates[1:] == dates[:-1]
+        if repeated.any():
+            keep = np.flatnonzero(np.append(~repeated, True))
+            self.dates[:len(keep)] = dates[keep]
+            self.values[:, :len(keep)] = self.values[:, keep]
+            self.length = len(keep)
+
+    def to_frame(self, local_tz=None, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """
+        Returns the candles in [start, stop) as a DataFrame sharing the buffer's memory. 'date'
+        stays epoch milliseconds, or becomes a timezone-aware column when 'local_tz' is given.
+        """
+        stop = self.length if stop is None else stop
+        dates = pd.Series(self.dates[start:stop], copy=False)
+        if local_tz is not None:
+            dates = localize_dates(dates, local_tz)
+        columns = {col: self.values[i, start:stop] for i, col in enumerate(VALUE_COLUMNS)}
+        # Without copy=False pandas would consolidate the columns into a new block
+        return pd.DataFrame({'date': dates, **columns}, copy=False)
+
+
+def localize_dates(dates: pd.Series, local_tz) -> pd.Series:
+    """
+    Reinterprets epoch milliseconds as a timezone-aware column. The int64 values are kept as they
+    are; the timezone is only dtype metadata.
+    """
+    return dates.astype(np.int64, copy=False).astype(pd.DatetimeTZDtype('ms', local_tz), copy=False)
+
+def with_local_dates(candles: pd.DataFrame, local_tz) -> pd.DataFrame:
+    columns = {col: candles[col] for col in candles.columns}
+    columns['date'] = localize_dates(candles['date'], local_tz)
+    return pd.DataFrame(columns, copy=False)
+
+def with_wall_clock_dates(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns a timezone-aware 'date' column into naive local wall time, the form files and charts
+    use. Only the date column is copied; other frames are returned unchanged.
+    """
+    if 'date' not in data.columns or not isinstance(data['date'].dtype, pd.DatetimeTZDtype):
+        return data
+    columns = {col: data[col] for col in data.columns}
+    columns['date'] = data['date'].dt.tz_localize(None)
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,76 @@
+import re
+import numpy as np
+import pandas as pd
+from app.candle_aggregator import aggregate_groups
+
+UNIT_MS = {
+    'm': 60_000,
+    'h': 3_600_000,
+    'd': 86_400_000,
+    'w': 604_800_000
+}
+DAY_MS = UNIT_MS['d']
+WEEK_OFFSET_MS = 4 * DAY_MS  # 1970-01-01 was a Thursday, weekly candles open on Monday 00:00 UTC
+
+class CandleResampler:
+    """
+    Builds coarser candles from a finer series the way the exchanges bucket them: minute, hour
+    and day candles are aligned to multiples of their width since the Unix epoch, weekly
+    candles to Monday 00:00 UTC and monthly candles to the first of the month, all in UTC.
+    Candles are expected with 'date' as epoch milliseconds, as kept by the CandleStore.
+    """
+    def parse(self, timeframe: str):
+        match = re.fullmatch(r'(\d+)([mhdwM])', timeframe)
+        if not match:
+            raise ValueError(f"Invalid timeframe format: '{timeframe}'. Expected formats like '1m', '2h', '1M', etc.")
+        amount_str, unit = match.groups()
+        return int(amount_str), unit
+
+    def fixed_width(self, timeframe: str):
+        # Milliseconds per candle, or None for calendar months
+        amount, unit = self.parse(timeframe)
+        return amount * UNIT_MS[unit] if unit in UNIT_MS else None
+
+    def can_resample(self, base_timeframe: str, target_timeframe: str) -> bool:
+        base_width = self.fixed_width(base_timeframe)
+        target_width = self.fixed_width(target_timeframe)
+        if base_width is None:
+            return False
+        _, target_unit = self.parse(target_timeframe)
+        if target_unit in ('w', 'M'):
+            # Weeks and months start at midnight, so the base candles must tile a day
+            return base_width <= DAY_MS and DAY_MS % base_width == 0
+        return base_width < target_width and target_width % base_width == 0
+
+    def bucket_starts(self, timestamps: np.ndarray, timeframe: str) -> np.ndarray:
+        amount, unit = self.parse(timeframe)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if unit == 'M':
+            months = timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+            months = (months // amount) * amount
+            return months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+        width = amount * UNIT_MS[unit]
+        offset = WEEK_OFFSET_MS if unit == 'w' else 0
+        return (timestamps - offset) // width * width + offset
+
+    def bucket_ends(self, timestamps: np.ndarray, timeframe: str) -> np.ndarray:
+        amount, unit = self.parse(timeframe)
+        starts = self.bucket_starts(timestamps, timeframe)
+        if unit == 'M':
+            months = starts.astype('datetime64[ms]').astype('datetime64[M]') + amount
+            return months.astype('datetime64[ms]').astype(np.int64)
+        return starts + amount * UNIT_MS[unit]
+
+    def resample(self, candles: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+        """
+        Aggregates sorted candles into 'timeframe' buckets, each dated at its bucket start.
+        Buckets are built from whatever base candles exist, so callers should only pass ranges
+        the base series fully covers.
+        """
+        if candles.empty:
+            return candles
+        starts = self.bucket_starts(candles['date'].to_numpy(), timeframe)
+        group_starts = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        resampled = aggregate_groups(candles, group_starts)
+        resampled['date'] = starts[group_starts]
+        return resampled
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import pandas as pd
+
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# Shared by every store instance, since the app builds a new one on each rerun while prefetches still write
+_series_locks = {}
+_series_locks_guard = threading.Lock()
+
+class CandleStore:
+    """
+    On-disk cache of closed candles, one directory per exchange/market type/symbol/timeframe
+    with one Parquet partition per UTC month. Dates are stored as epoch milliseconds.
+    A coverage file records which [start, end) millisecond ranges have already been
+    downloaded, so ranges the exchange has no candles for are not requested again.
+    """
+    def __init__(self, root: str):
+        self.root = root
+
+    def missing_ranges(self, exchange_id: str, market_type: str, symbol: str, timeframe: str,
+                       start: int, end: int) -> list:
+        missing = []
+        cursor = start
+        for covered_start, covered_end in self._read_coverage(exchange_id, market_type, symbol, timeframe):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                missing.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def read(self, exchange_id: str, market_type: str, symbol: str, timeframe: str,
+             start: int, end: int) -> pd.DataFrame:
+        series_dir = self._series_dir(exchange_id, market_type, symbol, timeframe)
+        frames = []
+        for partition in self._partitions(start, end):
+            path = os.path.join(series_dir, f"{partition}.parquet")
+            if os.path.exists(path):
+                frames.append(pd.read_parquet(path))
+        if not frames:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        return df[(df['date'] >= start) & (df['date'] < end)].reset_index(drop=True)
+
+    def write(self, exchange_id: str, market_type: str, symbol: str, timeframe: str,
+              candles: pd.DataFrame, start: int, end: int):
+        series_dir = self._series_dir(exchange_id, market_type, symbol, timeframe)
+        with self._lock(series_dir):
+            os.makedirs(series_dir, exist_ok=True)
+            if not candles.empty:
+                # Fixed dtypes, so every partition reads back the same way
+                candles = candles[OHLCV_COLUMNS].astype({'date': 'int64', **{col: 'float64' for col in OHLCV_COLUMNS[1:]}})
+                partitions = pd.to_datetime(candles['date'], unit='ms', utc=True).dt.strftime('%Y-%m')
+                for partition, rows in candles.groupby(partitions):
+                    self._write_partition(os.path.join(series_dir, f"{partition}.parquet"), rows)
+
+            # Coverage is only extended once the candles are on disk
+            if end <= start:
+                return
+            coverage = self._read_coverage(exchange_id, market_type, symbol, timeframe)
+            self._write_json(os.path.join(series_dir, 'coverage.json'), self._merge_ranges(coverage + [[start, end]]))
+
+    def _write_partition(self, path: str, rows: pd.DataFrame):
+        if os.path.exists(path):
+            rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+        rows = rows.drop_duplicates(subset='date', keep='last').sort_values('date').reset_index(drop=True)
+        tmp_path = f"{path}.tmp"
+        rows.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _read_coverage(self, exchange_id: str, market_type: str, symbol: str, timeframe: str) -> list:
+        path = os.path.join(self._series_dir(exchange_id, market_type, symbol, timeframe), 'coverage.json')
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write_json(self, path: str, payload):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def _series_dir(self, exchange_id: str, market_type: str, symbol: str, timeframe: str) -> str:
+        safe_symbol = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.root, exchange_id, market_type, safe_symbol, timeframe)
+
+    def _lock(self, series_dir: str) -> threading.Lock:
+        with _series_locks_guard:
+            return _series_locks.setdefault(os.path.abspath(series_dir), threading.Lock())
+
+    @staticmethod
+    def _partitions(start: int, end: int) -> list:
+        first = pd.Timestamp(start, unit='ms').to_period('M')
+        last = pd.Timestamp(max(start, end - 1), unit='ms').to_period('M')
+        return [str(period) for period in pd.period_range(first, last, freq='M')]
+
+    @staticmethod
+    def _merge_ranges(ranges: list) -> list:
+        merged = []
+        for range_start, range_end in sorted(ranges):
+            if merged and range_start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_end)
+            else:
+                merged.append([range_start, range_end])
+        return merged
@@ -1,32 +1,75 @@
 import pandas as pd
 import streamlit as st
 from lightweight_charts.widgets import StreamlitChart
+from app.candle_aggregator import aggregate_candles
+from app.candle_buffer import with_wall_clock_dates
+from app.metrics import metrics
 
 class ChartRenderer:
+    def __init__(self, width: int = 1024, height: int = 576, level_factor: int = 4):
+        self.width = width
+        self.height = height
+        self.level_factor = level_factor
+
     def display_chart(self, data: pd.DataFrame, symbol: str):
         try:
-            chart = StreamlitChart(width=1024, height=576, inner_width=1, inner_height=0.75)
-            chart.set(data)
-            chart.time_scale(visible=False)
-            chart.grid(vert_enabled=False, horz_enabled=False)
-            chart.legend(visible=True, font_family="Arial", text=symbol)
-            chart.fit()
-
-            # Dynamically add any indicators that have been merged into data
-            for col in data.columns:
-                if col.startswith('ema_'):
-                    line = chart.create_line(col, color='rgba(255, 235, 59, 0.6)', width=1,
-                                                price_line=False, price_label=False)
-                    line.set(data[['date', col]].dropna())
-
-            if 'macd' in data.columns:
-                sub_chart = chart.create_subchart(width=1, height=0.25, sync=True)
-                sub_chart.grid(vert_enabled=False, horz_enabled=False)
-                sub_chart.legend(visible=True, font_family="Arial")
-                macd_line = sub_chart.create_line('macd', color='rgba(41, 98, 255, 0.6)', width=1,
-                                                  price_line=False, price_label=False)
-                macd_line.set(data[['date', 'macd']].dropna())
-
-            chart.load()
+            # Only the level of detail that fits the chart width is sent to the browser
+            with metrics.timer('chart_seconds', stage='pyramid'):
+                data = self.select_level(self.get_pyramid(data))
+            metrics.observe('chart_bars', len(data))
+
+            with metrics.timer('chart_seconds', stage='serialize'):
+                self._render(data, symbol)
         except Exception as e:
             st.error(f"An error occurred while displaying the chart: {e}")
+
+    def _render(self, data: pd.DataFrame, symbol: str):
+        # The chart shows times as given, so they are converted to local wall time here, after downsampling
+        data = with_wall_clock_dates(data)
+        chart = StreamlitChart(width=self.width, height=self.height, inner_width=1, inner_height=0.75)
+        chart.set(data)
+        chart.time_scale(visible=False)
+        chart.grid(vert_enabled=False, horz_enabled=False)
+        chart.legend(visible=True, font_family="Arial", text=symbol)
+        chart.fit()
+
+        # Dynamically add any indicators that have been merged into data
+        for col in data.columns:
+            if col.startswith('ema_'):
+                line = chart.create_line(col, color='rgba(255, 235, 59, 0.6)', width=1,
+                                            price_line=False, price_label=False)
+                line.set(data[['date', col]].dropna())
+
+        if 'macd' in data.columns:
+            sub_chart = chart.create_subchart(width=1, height=0.25, sync=True)
+            sub_chart.grid(vert_enabled=False, horz_enabled=False)
+            sub_chart.legend(visible=True, font_family="Arial")
+            macd_line = sub_chart.create_line('macd', color='rgba(41, 98, 255, 0.6)', width=1,
+                                              price_line=False, price_label=False)
+            macd_line.set(data[['date', 'macd']].dropna())
+
+        chart.load()
+
+    def get_pyramid(self, data: pd.DataFrame) -> list:
+        """
+        Returns data pre-aggregated at 1x, 4x, 16x, ... candles per bar, down to the first level
+        that fits the chart width. The pyramid is kept in the session, so reruns that do not
+        change the data reuse it instead of aggregating again.
+        """
+        key = (id(data), len(data),
+               data['date'].iloc[-1] if not data.empty else None,
+               data['close'].iloc[-1] if not data.empty else None)
+        cached = st.session_state.get('chart_pyramid')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # Each level is built from the previous one, which gives the same buckets as aggregating the raw data
+        levels = [data]
+        while len(levels[-1]) > self.width:
+            levels.append(aggregate_candles(levels[-1], self.level_factor))
+        st.session_state['chart_pyramid'] = (key, levels)
+        return levels
+
+    def select_level(self, levels: list) -> pd.DataFrame:
+        # One bar per horizontal pixel at most
+        return next((level for level in levels if len(level) <= self.width), levels[-1])
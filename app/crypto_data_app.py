@@ -1,18 +1,26 @@
 import streamlit as st
 import os
-import ccxt
-from config import SUPPORTED_EXCHANGES, SUPPORTED_TIMEFRAMES, EXTRA_CANDLES
+import uuid
+import pandas as pd
+from config import (SUPPORTED_EXCHANGES, SUPPORTED_TIMEFRAMES, EXTRA_CANDLES, LIVE_TAIL_INTERVAL_SECONDS,
+                    PREFETCH_ENABLED, PREFETCH_TIMEFRAME_NEIGHBOURS)
 from datetime import datetime, timezone
+from functools import lru_cache, partial
 from zoneinfo import ZoneInfo, available_timezones
 from app.crypto_data_facade import CryptoDataFacade
 from app.chart_renderer import ChartRenderer
-from app.data_saver import DataSaverStrategy
+from app.data_saver import DataSaverStrategy, safe_symbol
+from app.metrics import metrics
+from app.prefetcher import Prefetcher
 
 class CryptoDataApp:
-    def __init__(self, facade: CryptoDataFacade, chart_renderer: ChartRenderer, saver: DataSaverStrategy):
+    def __init__(self, facade: CryptoDataFacade, chart_renderer: ChartRenderer, saver: DataSaverStrategy,
+                 savers: dict = None, prefetcher: Prefetcher = None):
         self.facade = facade
         self.chart_renderer = chart_renderer
         self.saver = saver
+        self.savers = savers or {saver.extension: saver}
+        self.prefetcher = prefetcher
         self.exchange_name = None
         self.symbol = None
         self.market_type = None
@@ -21,8 +29,13 @@ class CryptoDataApp:
         self.selected_date = None
         self.selected_time = None
         self.local_tz = None
+        self.live_tail = False
         if 'data' not in st.session_state:
             st.session_state['data'] = None
+        if 'indicator_states' not in st.session_state:
+            st.session_state['indicator_states'] = {}
+        if 'fetch_params' not in st.session_state:
+            st.session_state['fetch_params'] = None
         if 'trading_pair_input' not in st.session_state:
             st.session_state['trading_pair_input'] = 'BTCUSDT'  # Initialize with default value
 
@@ -34,7 +47,11 @@ class CryptoDataApp:
             self.setup_sidebar()
             
             if st.session_state['data'] is not None:
-                self.chart_renderer.display_chart(st.session_state['data'], self.symbol)
+                if self.live_tail:
+                    self.display_live_chart()
+                else:
+                    self.chart_renderer.display_chart(st.session_state['data'], self.symbol)
+                    self.prefetch_adjacent_windows()
                 self.setup_save_data()
                 
         except Exception as e:
@@ -45,17 +62,59 @@ class CryptoDataApp:
             try:
                 self.select_exchange()
                 self.setup_market_type()
+                self.suggest_symbols()
                 self.select_timeframe()
                 self.setup_datetime_inputs()
 
                 if st.button("Fetch Data"):
                     self.fetch_and_display_data()
 
+                self.live_tail = st.checkbox(
+                    "Live Tail",
+                    value=False,
+                    disabled=st.session_state['data'] is None,
+                    help=f"Poll for new candles every {LIVE_TAIL_INTERVAL_SECONDS} seconds and update the chart in place"
+                )
+
+                cache_stats = self.facade.cache_stats()
+                if cache_stats:
+                    st.caption(f"Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                               f"{cache_stats['bytes'] / (1024 * 1024):.1f} MB")
+
+                self.display_metrics()
+
             except Exception as e:
                 st.error(f"An error occurred in the input setup: {e}")
 
+    def display_metrics(self):
+        with st.expander("Metrics", expanded=False):
+            snapshot = metrics.snapshot()
+            if not snapshot['summaries'] and not snapshot['counters'] and not snapshot['gauges']:
+                st.caption("Nothing recorded yet.")
+                return
+
+            def labels(entry):
+                return ', '.join(f"{name}={value}" for name, value in entry['labels'].items())
+
+            if snapshot['summaries']:
+                st.dataframe(pd.DataFrame([{
+                    'metric': entry['name'],
+                    'labels': labels(entry),
+                    'count': entry['count'],
+                    'total': round(entry['sum'], 4),
+                    'mean': round(entry['sum'] / entry['count'], 4),
+                    'max': round(entry['max'], 4)
+                } for entry in snapshot['summaries']]), hide_index=True)
+            if snapshot['counters'] or snapshot['gauges']:
+                st.dataframe(pd.DataFrame([
+                    {'metric': entry['name'], 'labels': labels(entry), 'value': entry['value']}
+                    for entry in snapshot['counters'] + snapshot['gauges']
+                ]), hide_index=True)
+            st.download_button("Download Prometheus metrics", metrics.to_prometheus(), file_name="metrics.prom",
+                               mime="text/plain")
+
     def select_exchange(self):
-        self.exchange_name = st.selectbox("Select Exchange", list(SUPPORTED_EXCHANGES.keys()), index=1)  # Default to bybit
+        self.exchange_name = st.selectbox("Select Exchange", SUPPORTED_EXCHANGES, index=1)  # Default to bybit
 
         # Auto-capitalize the trading pair input
         def capitalize_symbol():
@@ -69,6 +128,24 @@ class CryptoDataApp:
 
         self.symbol = st.session_state.trading_pair_input.upper()
 
+    def suggest_symbols(self):
+        if not self.symbol:
+            return
+        suggestions = self.facade.suggest_symbols(self.symbol, self.market_type)
+
+        def apply_suggestion():
+            st.session_state.trading_pair_input = st.session_state.symbol_suggestion
+            st.session_state.symbol_suggestion = None
+
+        st.selectbox(
+            "Matching Symbols",
+            suggestions,
+            index=None,
+            key="symbol_suggestion",
+            placeholder="Pick a matching market" if suggestions else "No matching markets",
+            on_change=apply_suggestion
+        )
+
     def setup_market_type(self):
         if self.exchange_name == "bybit":
             self.market_type = st.selectbox("Select Market Type", ["spot", "perpetual"], index=1)
@@ -98,18 +175,9 @@ class CryptoDataApp:
 
     def get_timezones_with_offsets(self):
         try:
-            timezones = sorted(available_timezones())
-            timezone_offset_list = []
-            for tz_name in timezones:
-                tz = ZoneInfo(tz_name)
-                now = datetime.now(tz)
-                offset = now.utcoffset()
-                if offset is not None:
-                    hours_offset = int(offset.total_seconds() / 3600)
-                    minutes_offset = int((offset.total_seconds() % 3600) / 60)
-                    formatted_offset = f"UTC{hours_offset:+03d}:{minutes_offset:02d}"
-                    timezone_offset_list.append(f"{tz_name} ({formatted_offset})")
-            return timezone_offset_list
+            # UTC offsets only change at DST transitions, which fall on quarter-hour boundaries in UTC
+            slot = int(datetime.now(timezone.utc).timestamp() // TIMEZONE_SLOT_SECONDS)
+            return list(timezones_with_offsets(slot))
         except Exception as e:
             st.error(f"An error occurred while fetching timezones: {e}")
             return []
@@ -125,17 +193,112 @@ class CryptoDataApp:
                 market_type=self.market_type
             )
             if data is not None and not data.empty:
-                ema_10_df = self.facade.calculate_indicator('ema_10', data)
-                ema_20_df = self.facade.calculate_indicator('ema_20', data)
-                macd_df = self.facade.calculate_indicator('macd', data)
-                
-                trimmed_data = self.trim_data(data, ema_10_df, ema_20_df, macd_df)
-                st.session_state['data'] = trimmed_data
+                # Keep the indicator states as of the candle before the last one, which may still be forming,
+                # so live tail updates can continue from there without recomputing the history
+                indicators, indicator_states = self.facade.calculate_indicators(data, len(data) - 1)
+                st.session_state['data'] = self.trim_data(data, indicators)
+                st.session_state['indicator_states'] = indicator_states
+                st.session_state['fetch_params'] = self.current_fetch_params()
             else:
                 st.error("No data returned from the exchange for the specified date and time.")
         except Exception as e:
             st.error(f"An error occurred while fetching data: {e}")
 
+    def current_fetch_params(self) -> dict:
+        return {
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'limit': self.limit,
+            'selected_datetime': self.get_selected_datetime(),
+            'local_tz': self.local_tz,
+            'market_type': self.market_type
+        }
+
+    def prefetch_adjacent_windows(self):
+        """
+        Queues the fetches most likely to come next: the windows just before and after the one on
+        screen, then the same window on neighbouring timeframes. Once the inputs no longer match
+        the chart, whatever has not started yet is dropped.
+        """
+        if self.prefetcher is None or not PREFETCH_ENABLED:
+            return
+        owner = st.session_state.setdefault('prefetch_owner', uuid.uuid4().hex)
+        params = st.session_state['fetch_params']
+        if params is None or params != self.current_fetch_params():
+            self.prefetcher.cancel(owner)
+            return
+
+        selected_datetime = params['selected_datetime']
+        windows = [
+            (params['timeframe'], self.facade.shift_window(params['timeframe'], selected_datetime, -params['limit'])),
+            (params['timeframe'], self.facade.shift_window(params['timeframe'], selected_datetime, params['limit']))
+        ]
+        # Neighbours the fetcher's exchange supports, whichever exchange the selectbox shows
+        timeframes = SUPPORTED_TIMEFRAMES.get(self.facade.fetcher.exchange.id, [])
+        if params['timeframe'] in timeframes:
+            index = timeframes.index(params['timeframe'])
+            for offset in range(1, PREFETCH_TIMEFRAME_NEIGHBOURS + 1):
+                windows += [(timeframes[i], selected_datetime) for i in (index - offset, index + offset)
+                            if 0 <= i < len(timeframes)]
+
+        now = datetime.now(timezone.utc)
+        jobs = {}
+        for timeframe, window_datetime in windows:
+            if window_datetime is None or window_datetime > now:
+                continue
+            # Same arguments as fetch_and_display_data would use, so the results land under its cache keys
+            job = (params['symbol'], timeframe, params['limit'] + EXTRA_CANDLES, window_datetime,
+                   params['local_tz'], params['market_type'])
+            jobs[job] = partial(self.facade.prefetch_data, *job)
+        if jobs:
+            self.prefetcher.schedule(owner, jobs)
+        else:
+            self.prefetcher.cancel(owner)
+
+    def display_live_chart(self):
+        # Only this fragment reruns on each poll, the rest of the page stays as it is
+        @st.fragment(run_every=LIVE_TAIL_INTERVAL_SECONDS)
+        def live_chart():
+            self.tail_data()
+            self.chart_renderer.display_chart(st.session_state['data'], self.symbol)
+
+        live_chart()
+
+    def tail_data(self):
+        try:
+            data = st.session_state['data']
+            params = st.session_state['fetch_params']
+            if data is None or params is None:
+                return
+
+            # Ask only for candles from the last displayed one on, which replaces it if it was still forming
+            last_date = data['date'].iloc[-1]
+            new_data = self.facade.fetch_latest_data(
+                symbol=params['symbol'],
+                timeframe=params['timeframe'],
+                since=last_date.to_pydatetime(),
+                local_tz=params['local_tz'],
+                market_type=params['market_type']
+            )
+            if new_data is None or new_data.empty:
+                return
+            new_data = new_data[new_data['date'] >= last_date].reset_index(drop=True)
+            if new_data.empty:
+                return
+
+            indicators, indicator_states = self.facade.update_indicators(
+                new_data, st.session_state['indicator_states'], len(new_data) - 1
+            )
+            if indicators is None:
+                return
+
+            kept_data = data[data['date'] < new_data['date'].iloc[0]]
+            updated_data = pd.concat([kept_data, pd.concat([new_data, indicators], axis=1)], ignore_index=True)
+            st.session_state['data'] = updated_data.tail(len(data)).reset_index(drop=True)
+            st.session_state['indicator_states'] = indicator_states
+        except Exception as e:
+            st.error(f"An error occurred while updating live data: {e}")
+
     def get_selected_datetime(self):
         try:
             combined_datetime = datetime.combine(self.selected_date, self.selected_time)
@@ -149,42 +312,75 @@ class CryptoDataApp:
         except Exception as e:
             st.error(f"An error occurred while combining date and time: {e}")
 
-    def trim_data(self, data, ema_10_df, ema_20_df, macd_df):
-        trimmed_data = data.tail(self.limit)
-        trimmed_ema_10_df = ema_10_df.tail(self.limit)
-        trimmed_ema_20_df = ema_20_df.tail(self.limit)
-        trimmed_macd_df = macd_df.tail(self.limit)
-
-        trimmed_data = trimmed_data.copy()
-        trimmed_data = trimmed_data.merge(trimmed_ema_10_df, on='date', how='left')
-        trimmed_data = trimmed_data.merge(trimmed_ema_20_df, on='date', how='left')
-        trimmed_data = trimmed_data.merge(trimmed_macd_df, on='date', how='left')
-        return trimmed_data
+    def trim_data(self, data, indicators):
+        # Indicator columns share the candle index, so they are attached side by side instead of merged.
+        # The columns are views of the fetched ones; concat would copy them into a new block.
+        with metrics.timer('trim_seconds'):
+            data, indicators = data.tail(self.limit), indicators.tail(self.limit)
+            columns = {col: data[col] for col in data.columns}
+            columns.update((col, indicators[col]) for col in indicators.columns)
+            trimmed = pd.DataFrame(columns, copy=False)
+            trimmed.index = pd.RangeIndex(len(trimmed))
+            return trimmed
 
     def setup_save_data(self):
         left, center, right = st.columns([1,2,3])
         self.filename_prefix = left.text_input("Enter Filename Prefix", value="", key="save_prefix_input")
+        if len(self.savers) > 1:
+            file_format = center.selectbox("File Format", list(self.savers), key="save_format_input")
+            self.saver = self.savers[file_format]
         if st.button("Save Data"):
             self.save_data()
 
     def save_data(self):
         try:
-            if st.session_state['data'] is not None:
+            params = st.session_state['fetch_params']
+            if st.session_state['data'] is not None and params is not None:
                 data_to_save = st.session_state['data']
+                # Labelled with what the data was fetched with; the widgets may have changed since
+                symbol, timeframe = params['symbol'], params['timeframe']
                 latest_candle_datetime = data_to_save['date'].iloc[-1]  # Get the timestamp of the latest fetched candle
                 date_str = latest_candle_datetime.strftime('%Y-%m-%d')
                 time_str = latest_candle_datetime.strftime('%H-%M-%S')
                 prefix = self.filename_prefix.strip()  # Remove extra whitespace from the prefix
                 
-                filename = f"{prefix}_{self.symbol.replace('/', '_')}_{self.timeframe}_{date_str}_{time_str}.csv" if prefix else f"{self.symbol.replace('/', '_')}_{self.timeframe}_{date_str}_{time_str}.csv"
+                extension = self.saver.extension
+                filename = f"{prefix}_{safe_symbol(symbol)}_{timeframe}_{date_str}_{time_str}.{extension}" if prefix else f"{safe_symbol(symbol)}_{timeframe}_{date_str}_{time_str}.{extension}"
                 
                 save_dir = 'saved_data'
                 if not os.path.exists(save_dir):
                     os.makedirs(save_dir)
-                filepath = os.path.join(save_dir, filename)
-                self.facade.save_data(data_to_save, self.saver, filepath)
+                metadata = {
+                    # The exchange the candles were fetched from, which the selectbox does not decide
+                    'exchange': self.facade.fetcher.exchange.id,
+                    'market_type': params['market_type'],
+                    'symbol': symbol,
+                    'timeframe': timeframe,
+                    'timezone': str(params['local_tz'])
+                }
+                filepath = self.saver.destination(save_dir, filename, metadata)
+                self.facade.save_data(data_to_save, self.saver, filepath, metadata)
                 st.success(f"Data saved successfully as {filepath}!")
             else:
                 st.error("No data to save. Please fetch data first.")
         except Exception as e:
             st.error(f"An error occurred while saving the data: {e}")
+
+TIMEZONE_SLOT_SECONDS = 15 * 60
+
+@lru_cache(maxsize=1)
+def timezones_with_offsets(slot: int) -> tuple:
+    """
+    Builds the "Zone (UTC+hh:mm)" labels as of the start of the given quarter-hour slot. Cached
+    per process, so reruns and sessions only rebuild the list when a new slot begins.
+    """
+    moment = datetime.fromtimestamp(slot * TIMEZONE_SLOT_SECONDS, timezone.utc)
+    timezone_offset_list = []
+    for tz_name in sorted(available_timezones()):
+        offset = moment.astimezone(ZoneInfo(tz_name)).utcoffset()
+        if offset is not None:
+            hours_offset = int(offset.total_seconds() / 3600)
+            minutes_offset = int((offset.total_seconds() % 3600) / 60)
+            formatted_offset = f"UTC{hours_offset:+03d}:{minutes_offset:02d}"
+            timezone_offset_list.append(f"{tz_name} ({formatted_offset})")
+    return tuple(timezone_offset_list)
@@ -1,39 +1,158 @@
 from app.market_data_fetcher import MarketDataFetcher
 from app.indicators import IndicatorRegistry
 from app.data_saver import DataSaverStrategy
+from app.result_cache import ResultCache
+from app.metrics import metrics
+from app.request_scheduler import INTERACTIVE, BACKGROUND
 import streamlit as st
 import pandas as pd
 
 class CryptoDataFacade:
-    def __init__(self, fetcher: MarketDataFetcher, indicator_registry: IndicatorRegistry):
+    def __init__(self, fetcher: MarketDataFetcher, indicator_registry: IndicatorRegistry,
+                 result_cache: ResultCache = None):
         self.fetcher = fetcher
         self.indicator_registry = indicator_registry
+        self.result_cache = result_cache
 
-    def fetch_data(self, symbol: str, timeframe: str, limit: int, selected_datetime, local_tz, market_type: str):
+    def fetch_data(self, symbol: str, timeframe: str, limit: int, selected_datetime, local_tz, market_type: str,
+                   priority: int = INTERACTIVE):
         try:
-            return self.fetcher.fetch_ohlcv(
+            def fetch():
+                return self.fetcher.fetch_ohlcv(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    limit=limit,
+                    selected_datetime=selected_datetime,
+                    local_tz=local_tz,
+                    market_type=market_type,
+                    priority=priority
+                )
+
+            # Covers cache hits and waits on a collapsed request, unlike the fetcher's own timer
+            with metrics.timer('facade_seconds', operation='fetch_data'):
+                return self._cached_fetch(symbol, timeframe, limit, selected_datetime, local_tz, market_type, fetch)
+        except Exception as e:
+            st.error(f"An error occurred while fetching OHLCV data: {e}")
+
+    def prefetch_data(self, symbol: str, timeframe: str, limit: int, selected_datetime, local_tz, market_type: str):
+        """
+        Fetches a window and its indicators into the result cache in the scheduler's background
+        lane, so a later fetch_data and calculate_indicators for it are cache hits. Runs off the
+        script thread, so errors are raised instead of shown.
+        """
+        if self.result_cache is None:
+            return
+
+        def fetch():
+            start, end = self.fetcher.window_bounds(timeframe, limit, selected_datetime)
+            return self.fetcher.fetch_ohlcv_range(symbol, timeframe, start, end, local_tz, market_type, limit,
+                                                  priority=BACKGROUND)
+
+        data = self._cached_fetch(symbol, timeframe, limit, selected_datetime, local_tz, market_type, fetch)
+        if data is not None and not data.empty:
+            # The app keeps the indicator states as of the candle before the last one
+            state_rows = len(data) - 1
+            self._cached(self._indicators_key(state_rows), data,
+                         lambda: self.indicator_registry.calculate_all(data, state_rows))
+
+    def shift_window(self, timeframe: str, selected_datetime, candles: int):
+        # Moves the end of a window by 'candles' candles, back when negative
+        try:
+            delta = self.fetcher.delta_calculator.calculate_delta(timeframe, abs(candles))
+            return selected_datetime + delta if candles >= 0 else selected_datetime - delta
+        except Exception as e:
+            st.error(f"An error occurred while shifting the window: {e}")
+
+    def _cached_fetch(self, symbol: str, timeframe: str, limit: int, selected_datetime, local_tz, market_type: str,
+                      fetch):
+        if self.result_cache is None:
+            return fetch()
+
+        # Spellings of the same market share an entry; the window ends with the candle at selected_datetime
+        key = ('ohlcv', self.fetcher.exchange.id, market_type, self.fetcher.resolve_symbol(symbol, market_type),
+               timeframe, int(selected_datetime.timestamp() * 1000), limit, str(local_tz))
+        window_end = selected_datetime + self.fetcher.delta_calculator.calculate_delta(timeframe, 1)
+        forming = window_end > self.fetcher.now()
+
+        def fetch_and_tag():
+            data = fetch()
+            if data is not None:
+                data.attrs.update({'cache_key': key, 'cache_forming': forming})
+            return data
+
+        return self.result_cache.get_or_compute(key, fetch_and_tag, forming)
+
+    def fetch_latest_data(self, symbol: str, timeframe: str, since, local_tz, market_type: str):
+        try:
+            return self.fetcher.fetch_ohlcv_since(
                 symbol=symbol,
                 timeframe=timeframe,
-                limit=limit,
-                selected_datetime=selected_datetime,
+                since=since,
                 local_tz=local_tz,
                 market_type=market_type
             )
         except Exception as e:
-            st.error(f"An error occurred while fetching OHLCV data: {e}")
+            st.error(f"An error occurred while fetching the latest OHLCV data: {e}")
+            return pd.DataFrame()
+
+    def suggest_symbols(self, prefix: str, market_type: str, limit: int = 10) -> list:
+        try:
+            return self.fetcher.suggest_symbols(prefix, market_type, limit)
+        except Exception as e:
+            st.error(f"An error occurred while loading the market list: {e}")
+            return []
 
     def calculate_indicator(self, indicator_name: str, data: pd.DataFrame) -> pd.DataFrame:
         try:
             if data.empty:
                 return pd.DataFrame()
             indicator = self.indicator_registry.get(indicator_name)
-            return indicator.calculate(data)
+            return self._cached(('indicator', indicator_name), data, lambda: indicator.calculate(data))
         except Exception as e:
             st.error(f"An error occurred while calculating the {indicator_name} indicator: {e}")
             return pd.DataFrame()
 
-    def save_data(self, data: pd.DataFrame, saver_strategy: DataSaverStrategy, filename: str):
+    def calculate_indicators(self, data: pd.DataFrame, state_rows: int = None):
         try:
-            saver_strategy.save(data, filename)
+            if data.empty:
+                return pd.DataFrame(), {}
+            return self._cached(self._indicators_key(state_rows), data, lambda: self.indicator_registry.calculate_all(data, state_rows))
         except Exception as e:
-            st.error(f"An error occurred while saving data: {e}")
\ No newline at end of file
+            st.error(f"An error occurred while calculating indicators: {e}")
+            return pd.DataFrame(index=data.index), {}
+
+    def update_indicators(self, data: pd.DataFrame, states: dict, state_rows: int = None):
+        try:
+            return self.indicator_registry.update_all(data, states, state_rows)
+        except Exception as e:
+            st.error(f"An error occurred while updating indicators: {e}")
+            return None, states
+
+    def update_indicator(self, indicator_name: str, data: pd.DataFrame, state: dict = None):
+        try:
+            if data.empty:
+                return pd.DataFrame(), state
+            indicator = self.indicator_registry.get(indicator_name)
+            return indicator.calculate_incremental(data, state)
+        except Exception as e:
+            st.error(f"An error occurred while updating the {indicator_name} indicator: {e}")
+            return pd.DataFrame(), None
+
+    def save_data(self, data: pd.DataFrame, saver_strategy: DataSaverStrategy, filename: str, metadata: dict = None):
+        try:
+            saver_strategy.save(data, filename, metadata)
+        except Exception as e:
+            st.error(f"An error occurred while saving data: {e}")
+
+    def cache_stats(self) -> dict:
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def _indicators_key(self, state_rows: int) -> tuple:
+        return ('indicators', tuple(self.indicator_registry.names()), state_rows)
+
+    def _cached(self, key: tuple, data: pd.DataFrame, compute):
+        # Only frames returned by fetch_data carry a cache key; length and last date guard against slices of them
+        if self.result_cache is None or 'cache_key' not in data.attrs:
+            return compute()
+        key += (data.attrs['cache_key'], len(data), data['date'].iloc[-1])
+        return self.result_cache.get_or_compute(key, compute, data.attrs.get('cache_forming', False))
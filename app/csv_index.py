@@ -0,0 +1,108 @@
+import bisect
+import math
+import numpy as np
+import pandas as pd
+
+DATE_COLUMNS = ('date', 'timestamp')
+BLOCK_SIZE = 16 * 1024 * 1024
+
+class CsvTimeIndex:
+    """
+    Sparse time index over a date-sorted CSV file: the byte offset and first date of every
+    'chunk_rows' rows. Building it only scans for line breaks and parses one date per chunk,
+    so a date range can then be read by seeking straight to the chunks that overlap it.
+    """
+    def __init__(self, columns: list, date_column: str, offsets: list, dates: list, row_count: int,
+                 last_date: pd.Timestamp, chunk_rows: int):
+        self.columns = columns
+        self.date_column = date_column
+        self.offsets = offsets
+        self.dates = dates
+        self.row_count = row_count
+        self.last_date = last_date
+        self.chunk_rows = chunk_rows
+
+    @property
+    def first_date(self) -> pd.Timestamp:
+        return self.dates[0] if self.dates else None
+
+    @classmethod
+    def build(cls, file, chunk_rows: int = 100_000):
+        """
+        'file' is a binary file object, e.g. a path opened with 'rb' or a Streamlit upload.
+        """
+        file.seek(0)
+        header = file.readline()
+        columns = header.decode().strip().split(',')
+        date_column = next((col for col in DATE_COLUMNS if col in columns), None)
+        if date_column is None:
+            raise ValueError(f"No date column found, expected one of: {', '.join(DATE_COLUMNS)}")
+
+        offsets = [len(header)]
+        position = len(header)
+        row = 0
+        last_byte = b'\n'
+        while True:
+            block = file.read(BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            # The row after the k-th newline of this block is row number row + 1 + k
+            next_rows = row + 1 + np.arange(len(newlines))
+            offsets.extend((newlines[next_rows % chunk_rows == 0] + 1 + position).tolist())
+            row += len(newlines)
+            position += len(block)
+            last_byte = block[-1:]
+        row_count = row + (0 if last_byte == b'\n' else 1)
+
+        date_index = columns.index(date_column)
+        dates = []
+        for offset in offsets:
+            file.seek(offset)
+            line = file.readline().decode().strip()
+            if line:
+                dates.append(pd.Timestamp(line.split(',')[date_index]))
+        # Only the offset just past a trailing newline can be empty
+        offsets = offsets[:len(dates)]
+        last_date = cls._read_last_date(file, position, date_index)
+        return cls(columns, date_column, offsets, dates, row_count, last_date, chunk_rows)
+
+    def estimate_rows(self, start: pd.Timestamp, end: pd.Timestamp) -> int:
+        # Candles are evenly spaced, so the share of the file's time span is a close estimate
+        if self.first_date is None or self.last_date is None or self.last_date <= self.first_date:
+            return self.row_count
+        covered = min(end, self.last_date) - max(start, self.first_date)
+        share = max(covered, pd.Timedelta(0)) / (self.last_date - self.first_date)
+        return min(self.row_count, math.ceil(self.row_count * share) + 1)
+
+    def read_range(self, file, start: pd.Timestamp, end: pd.Timestamp, chunksize: int = 100_000, dtype: str = 'float64'):
+        """
+        Yields DataFrame chunks holding the rows with start <= date <= end, parsed with explicit
+        dtypes and the date column renamed to 'date'.
+        """
+        if not self.offsets:
+            return
+        first_chunk = self._first_chunk(start)
+        file.seek(self.offsets[first_chunk])
+        dtypes = {col: dtype for col in self.columns if col != self.date_column}
+        # Closing the reader explicitly detaches pandas from 'file' instead of closing it
+        with pd.read_csv(file, header=None, names=self.columns, dtype=dtypes,
+                         parse_dates=[self.date_column], chunksize=chunksize) as reader:
+            for chunk in reader:
+                if chunk.empty:
+                    continue
+                chunk = chunk.rename(columns={self.date_column: 'date'})
+                if chunk['date'].iloc[0] > end:
+                    break
+                yield chunk[(chunk['date'] >= start) & (chunk['date'] <= end)].reset_index(drop=True)
+
+    def _first_chunk(self, start: pd.Timestamp) -> int:
+        return max(0, bisect.bisect_right(self.dates, start) - 1)
+
+    @staticmethod
+    def _read_last_date(file, size: int, date_index: int):
+        file.seek(max(0, size - 4096))
+        lines = [line for line in file.read().splitlines() if line.strip()]
+        if not lines:
+            return None
+        return pd.Timestamp(lines[-1].decode().split(',')[date_index])
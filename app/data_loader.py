@@ -0,0 +1,72 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import pandas as pd
+from app.data_saver import METADATA_KEY, read_manifest
+
+class DataLoaderStrategy(ABC):
+    """
+    Reads files written by the matching DataSaverStrategy. 'source' is a path or a file-like
+    object; embedded metadata (exchange, symbol, timeframe, timezone) ends up in df.attrs.
+    """
+    @abstractmethod
+    def load(self, source) -> pd.DataFrame:
+        pass
+
+class CsvLoader(DataLoaderStrategy):
+    def load(self, source) -> pd.DataFrame:
+        df = pd.read_csv(source)
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+def _table_to_frame(table) -> pd.DataFrame:
+    df = table.to_pandas()
+    metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+    if metadata:
+        df.attrs.update(json.loads(metadata))
+    return df
+
+class ParquetLoader(DataLoaderStrategy):
+    def load(self, source) -> pd.DataFrame:
+        import pyarrow.parquet as pq
+        return _table_to_frame(pq.read_table(source, memory_map=isinstance(source, (str, os.PathLike))))
+
+class FeatherLoader(DataLoaderStrategy):
+    def load(self, source) -> pd.DataFrame:
+        import pyarrow.feather as feather
+        return _table_to_frame(feather.read_table(source, memory_map=isinstance(source, (str, os.PathLike))))
+
+class DatasetLoader(DataLoaderStrategy):
+    """
+    Reads a dataset directory written by DatasetSaver: its segments in manifest order, where
+    later candles replace earlier ones with the same date.
+    """
+    def load(self, source) -> pd.DataFrame:
+        manifest = read_manifest(source)
+        if manifest is None:
+            raise ValueError(f"'{source}' is not a dataset directory.")
+        import pyarrow.feather as feather
+        frames = [_table_to_frame(feather.read_table(os.path.join(source, segment['file']), memory_map=True))
+                  for segment in manifest['segments']]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        df = df.drop_duplicates(subset='date', keep='last').sort_values('date', kind='stable').reset_index(drop=True)
+        df.attrs.update(frames[-1].attrs)
+        return df
+
+LOADERS = {
+    'csv': CsvLoader(),
+    'parquet': ParquetLoader(),
+    'feather': FeatherLoader(),
+    'arrow': FeatherLoader()
+}
+
+def get_loader(filename: str) -> DataLoaderStrategy:
+    if isinstance(filename, (str, os.PathLike)) and os.path.isdir(filename):
+        return DatasetLoader()
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported file type: '{extension}'. Supported types are {', '.join(LOADERS)}.")
+    return LOADERS[extension]
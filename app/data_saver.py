@@ -1,15 +1,253 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import json
+import os
+import threading
+import numpy as np
 import pandas as pd
 import streamlit as st
+from app.candle_buffer import with_wall_clock_dates
+from app.metrics import metrics
+
+METADATA_KEY = b'cryptodatadownloader'
+CANDLE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+MANIFEST_NAME = 'manifest.json'
+SERIES_KEYS = ('exchange', 'market_type', 'symbol', 'timeframe')
+
+# Shared by every saver instance, since the app builds new ones on each rerun and bulk jobs save concurrently
+_dataset_locks = {}
+_dataset_locks_guard = threading.Lock()
+
+def safe_symbol(symbol: str) -> str:
+    # BTC/USDT:USDT -> BTC_USDT_USDT; neither separator is allowed in Windows file names
+    return symbol.replace('/', '_').replace(':', '_')
+
+def sidecar_path(filename: str) -> str:
+    # Metadata of a CSV file, which has nowhere to embed it: BTC_USDT_1h_....csv.json
+    return filename + '.json'
+
+def read_sidecar(filename: str) -> dict:
+    try:
+        with open(sidecar_path(filename)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
 
 class DataSaverStrategy(ABC):
+    extension = None
+
     @abstractmethod
-    def save(self, data: pd.DataFrame, filename: str):
+    def save(self, data: pd.DataFrame, filename: str, metadata: dict = None):
         pass
 
+    def destination(self, directory: str, filename: str, metadata: dict) -> str:
+        """
+        Path save() should be given for data described by 'metadata', where 'filename' is the
+        name the caller would use for a new file.
+        """
+        return os.path.join(directory, filename)
+
+    @contextmanager
+    def _measured(self, filename):
+        with metrics.timer('save_seconds', format=self.extension):
+            yield
+        if isinstance(filename, str) and os.path.exists(filename):
+            metrics.increment('bytes_written', os.path.getsize(filename), format=self.extension)
+
 class CsvSaver(DataSaverStrategy):
-    def save(self, data: pd.DataFrame, filename: str):
+    extension = 'csv'
+
+    def save(self, data: pd.DataFrame, filename: str, metadata: dict = None):
         try:
-            data.to_csv(filename, index=False)
+            with self._measured(filename):
+                if metadata:
+                    # Written before the CSV, so the catalog never indexes the file without it
+                    temporary = sidecar_path(filename) + '.tmp'
+                    with open(temporary, 'w') as f:
+                        json.dump(metadata, f)
+                    os.replace(temporary, sidecar_path(filename))
+                with_wall_clock_dates(data).to_csv(filename, index=False)
         except Exception as e:
             st.error(f"An error occurred while saving CSV: {e}")
+
+def to_arrow_table(data: pd.DataFrame, metadata: dict = None):
+    """
+    Converts candles to an Arrow table with a fixed schema: millisecond timestamps in local wall
+    time for 'date', float64 for prices, volume and indicator columns, and the metadata embedded
+    as JSON.
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(with_wall_clock_dates(data), preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if field.name == 'date':
+            fields.append(pa.field('date', pa.timestamp('ms')))
+        elif field.name in CANDLE_COLUMNS or pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+            fields.append(pa.field(field.name, pa.float64()))
+        else:
+            fields.append(field)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = json.dumps(metadata or {}).encode()
+    return table.cast(pa.schema(fields, metadata=schema_metadata))
+
+class ParquetSaver(DataSaverStrategy):
+    extension = 'parquet'
+
+    def __init__(self, compression: str = 'zstd'):
+        self.compression = compression
+
+    def save(self, data: pd.DataFrame, filename: str, metadata: dict = None):
+        try:
+            import pyarrow.parquet as pq
+            with self._measured(filename):
+                pq.write_table(to_arrow_table(data, metadata), filename, compression=self.compression or 'none')
+        except Exception as e:
+            st.error(f"An error occurred while saving Parquet: {e}")
+
+class FeatherSaver(DataSaverStrategy):
+    """
+    Writes Feather v2 files, i.e. the Arrow IPC file format. Uncompressed files can be memory
+    mapped without copying; 'lz4' or 'zstd' trade that for smaller files.
+    """
+    extension = 'feather'
+
+    def __init__(self, compression: str = None):
+        self.compression = compression
+
+    def save(self, data: pd.DataFrame, filename: str, metadata: dict = None):
+        try:
+            import pyarrow.feather as feather
+            with self._measured(filename):
+                feather.write_feather(to_arrow_table(data, metadata), filename,
+                                      compression=self.compression or 'uncompressed')
+        except Exception as e:
+            st.error(f"An error occurred while saving Feather: {e}")
+
+class DatasetSaver(DataSaverStrategy):
+    """
+    Keeps one dataset per exchange/market type/symbol/timeframe instead of a file per save: a
+    directory of Feather segments listed in manifest.json. A save writes only the candles the
+    dataset does not hold yet, plus any candle that was the last one of an earlier save and may
+    have still been forming, as a new segment; later segments win over earlier ones. Segments
+    and the manifest are written to a temp file and renamed into place, so readers following the
+    manifest never see a partial file. The newest segments are merged while the one before is at
+    most 'compaction_ratio' times their size, which keeps the segment count logarithmic in the
+    number of candles. Dates are stored in UTC, so saves made in different timezones line up.
+    """
+    extension = 'feather'
+
+    def __init__(self, compaction_ratio: float = 2.0):
+        self.compaction_ratio = compaction_ratio
+
+    def destination(self, directory: str, filename: str, metadata: dict) -> str:
+        symbol = safe_symbol(metadata['symbol'])
+        return os.path.join(directory, f"{metadata['exchange']}_{metadata['market_type']}_{symbol}_{metadata['timeframe']}")
+
+    def save(self, data: pd.DataFrame, filename: str, metadata: dict = None):
+        try:
+            with metrics.timer('save_seconds', format='dataset'), self._lock(filename):
+                self._upsert(data, filename, metadata or {})
+        except Exception as e:
+            st.error(f"An error occurred while saving the dataset: {e}")
+
+    def _upsert(self, data: pd.DataFrame, directory: str, metadata: dict):
+        os.makedirs(directory, exist_ok=True)
+        series = {key: metadata.get(key) for key in SERIES_KEYS}
+        manifest = read_manifest(directory) or {'series': series, 'segments': [], 'unsettled': [], 'retired': [],
+                                                'next_segment': 0}
+        # Candles of another exchange or market would otherwise be merged into this one by timestamp
+        if manifest.get('series', series) != series:
+            raise ValueError(f"Dataset {directory} holds {manifest['series']}, not {series}.")
+        # Readers of the previous manifest may still have been opening these
+        for name in manifest['retired']:
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+        manifest['retired'] = []
+
+        data = _with_utc_dates(data, metadata.get('timezone'))
+        dates = _utc_ms(data['date'])
+        held = np.zeros(len(data), dtype=bool)
+        for segment in manifest['segments']:
+            if len(dates) == 0 or segment['last_ms'] < dates[0] or segment['first_ms'] > dates[-1]:
+                continue
+            # A segment's range can span gaps it holds no candles for, so its own dates decide
+            stored = _segment_dates(directory, segment['file'])
+            found = np.searchsorted(stored, dates).clip(max=len(stored) - 1)
+            held |= stored[found] == dates
+        new_rows = data[~held | np.isin(dates, manifest['unsettled'])]
+        if new_rows.empty:
+            return
+
+        metadata = {**metadata, 'timezone': 'UTC'}
+        manifest['segments'].append(self._write_segment(directory, manifest, new_rows, metadata))
+        last_ms = int(dates.max())
+        settled = set(dates[dates < last_ms].tolist())
+        manifest['unsettled'] = sorted((set(manifest['unsettled']) - settled) | {last_ms})
+
+        segments = manifest['segments']
+        while len(segments) > 1 and segments[-2]['rows'] <= self.compaction_ratio * segments[-1]['rows']:
+            older, newer = segments[-2], segments[-1]
+            merged = pd.concat([read_segment(directory, older['file']), read_segment(directory, newer['file'])],
+                               ignore_index=True)
+            merged = merged.drop_duplicates(subset='date', keep='last').sort_values('date', kind='stable')
+            segments[-2:] = [self._write_segment(directory, manifest, merged, metadata)]
+            manifest['retired'] += [older['file'], newer['file']]
+            metrics.increment('dataset_compactions')
+
+        _write_json_atomically(os.path.join(directory, MANIFEST_NAME), manifest)
+
+    def _write_segment(self, directory: str, manifest: dict, rows: pd.DataFrame, metadata: dict) -> dict:
+        import pyarrow.feather as feather
+        name = f"{manifest['next_segment']:06d}.feather"
+        manifest['next_segment'] += 1
+        path = os.path.join(directory, name)
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(to_arrow_table(rows, metadata), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        metrics.increment('bytes_written', os.path.getsize(path), format='dataset')
+
+        dates = _utc_ms(rows['date'])
+        return {'file': name, 'first_ms': int(dates.min()), 'last_ms': int(dates.max()), 'rows': len(rows)}
+
+    @staticmethod
+    def _lock(directory: str) -> threading.Lock:
+        with _dataset_locks_guard:
+            return _dataset_locks.setdefault(os.path.abspath(directory), threading.Lock())
+
+def read_manifest(directory: str):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def read_segment(directory: str, name: str) -> pd.DataFrame:
+    import pyarrow.feather as feather
+    return feather.read_table(os.path.join(directory, name), memory_map=True).to_pandas()
+
+def _segment_dates(directory: str, name: str) -> np.ndarray:
+    # Memory mapped, so the binary search only touches the pages it probes
+    import pyarrow.feather as feather
+    dates = feather.read_table(os.path.join(directory, name), columns=['date'], memory_map=True).column('date')
+    return dates.to_numpy().astype('datetime64[ms]').view(np.int64)
+
+def _with_utc_dates(data: pd.DataFrame, local_tz: str = None) -> pd.DataFrame:
+    columns = {col: data[col] for col in data.columns}
+    dates = pd.to_datetime(data['date'])
+    if not isinstance(dates.dtype, pd.DatetimeTZDtype):
+        # Naive dates are wall times in the timezone the metadata names
+        dates = dates.dt.tz_localize(local_tz or 'UTC', ambiguous='infer')
+    columns['date'] = dates.dt.tz_convert('UTC')
+    return pd.DataFrame(columns, copy=False).sort_values('date', kind='stable')
+
+def _utc_ms(dates: pd.Series) -> np.ndarray:
+    # Segments read back hold naive UTC dates, new rows aware ones
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+    return dates.dt.as_unit('ms').array.asi8
+
+def _write_json_atomically(path: str, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
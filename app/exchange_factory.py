@@ -0,0 +1,36 @@
+import threading
+
+class ExchangeFactory:
+    """
+    Creates ccxt exchange instances on first use and hands out the same instance afterwards.
+    ccxt itself is only imported when the first exchange is requested. The module-level
+    instance below lives as long as the process, so Streamlit reruns and sessions share it.
+    """
+    def __init__(self, exchange_ids: list):
+        self.exchange_ids = list(exchange_ids)
+        self._exchanges = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange_id: str):
+        if exchange_id not in self.exchange_ids:
+            raise ValueError(f"Exchange '{exchange_id}' is not supported.")
+        exchange = self._exchanges.get(exchange_id)
+        if exchange is None:
+            with self._lock:
+                exchange = self._exchanges.get(exchange_id)
+                if exchange is None:
+                    import ccxt
+                    # Requests are paced by app.request_scheduler; ccxt's own throttle would delay them again
+                    exchange = getattr(ccxt, exchange_id)({'enableRateLimit': False})
+                    self._exchanges[exchange_id] = exchange
+        return exchange
+
+    def created(self) -> list:
+        return list(self._exchanges)
+
+
+def _default_factory():
+    from config import SUPPORTED_EXCHANGES
+    return ExchangeFactory(SUPPORTED_EXCHANGES)
+
+exchange_factory = _default_factory()
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from app.candle_resampler import CandleResampler
+
+class FakeExchange:
+    """
+    Deterministic stand-in for a ccxt exchange that implements fetchOHLCV only, for exercising
+    the fetcher, live tail mode and benchmarks without network access. Prices are a function of
+    time, the clock can be pinned and moved by hand, and the candle containing 'now' is returned
+    still forming, with its close following the clock. Each request can be delayed by 'latency'
+    seconds, and more than 'max_requests_per_second' requests within a second are rejected with
+    ccxt's RateLimitExceeded, like a real exchange would.
+    """
+    def __init__(self, exchange_id: str = 'fake', now_ms: int = None, page_size: int = 1000,
+                 latency: float = 0.0, max_requests_per_second: float = None):
+        self.id = exchange_id
+        self.now_ms = now_ms
+        self.page_size = page_size
+        self.latency = latency
+        self.max_requests_per_second = max_requests_per_second
+        self.rateLimit = 1000 / max_requests_per_second if max_requests_per_second else 0
+        self.resampler = CandleResampler()
+        self.requests = []
+        self._recent_requests = deque()
+        self._rate_lock = threading.Lock()
+
+    def now(self) -> int:
+        return self.now_ms if self.now_ms is not None else int(time.time() * 1000)
+
+    def milliseconds(self) -> int:
+        # Same clock accessor as ccxt exchanges, so the fetcher sees the pinned time
+        return self.now()
+
+    def advance(self, milliseconds: int):
+        self.now_ms = self.now() + milliseconds
+
+    def fetchOHLCV(self, symbol: str, timeframe: str = '1m', since: int = None, limit: int = None, params: dict = None):
+        self.requests.append({'symbol': symbol, 'timeframe': timeframe, 'since': since, 'limit': limit})
+        self._check_rate_limit()
+        if self.latency:
+            time.sleep(self.latency)
+
+        now = self.now()
+        limit = min(limit or self.page_size, self.page_size)
+        width = self.resampler.fixed_width(timeframe)
+        if since is None:
+            since = now - limit * (width or 31 * 86_400_000)
+
+        # First candle opening at or after 'since'
+        open_time = int(self.resampler.bucket_starts([since], timeframe)[0])
+        if open_time < since:
+            open_time = int(self.resampler.bucket_ends([open_time], timeframe)[0])
+        if open_time > now:
+            return []
+
+        if width is not None:
+            count = min(limit, (now - open_time) // width + 1)
+            opens = open_time + np.arange(count, dtype=np.int64) * width
+            closes = opens + width
+        else:
+            opens = [open_time]
+            while len(opens) < limit:
+                next_open = int(self.resampler.bucket_ends([opens[-1]], timeframe)[0])
+                if next_open > now:
+                    break
+                opens.append(next_open)
+            opens = np.asarray(opens, dtype=np.int64)
+            closes = self.resampler.bucket_ends(opens, timeframe)
+        return self._candles(opens, np.minimum(closes, now))
+
+    def _check_rate_limit(self):
+        if not self.max_requests_per_second:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            while self._recent_requests and now - self._recent_requests[0] >= 1.0:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= self.max_requests_per_second:
+                import ccxt
+                raise ccxt.RateLimitExceeded(f"{self.id} rate limit of {self.max_requests_per_second} requests per second exceeded")
+            self._recent_requests.append(now)
+
+    def _candles(self, opens: np.ndarray, last_times: np.ndarray) -> list:
+        open_prices = self._price(opens)
+        close_prices = self._price(last_times)
+        middle_prices = self._price((opens + last_times) // 2)
+        highs = np.maximum(np.maximum(open_prices, close_prices), middle_prices)
+        lows = np.minimum(np.minimum(open_prices, close_prices), middle_prices)
+        volumes = np.round(1.0 + (last_times - opens) / 60_000 * (1 + (opens // 60_000) % 7), 6)
+        return [
+            [int(timestamp), *values]
+            for timestamp, values in zip(opens, np.column_stack([open_prices, highs, lows, close_prices, volumes]).tolist())
+        ]
+
+    @staticmethod
+    def _price(timestamps: np.ndarray) -> np.ndarray:
+        hours = timestamps / 3_600_000
+        return np.round(20_000 + 1_000 * np.sin(2 * np.pi * hours / 168) + 50 * np.sin(2 * np.pi * hours / 3), 2)
@@ -1,11 +1,80 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
+from app.metrics import metrics
+
+class IndicatorContext:
+    """
+    Shared intermediates for one pass over a candle frame, so indicators that need the same
+    series (e.g. MACD's EMA12/EMA26 next to plain EMAs) compute it only once.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.close = df['close']
+        self._emas = {}
+
+    def ema(self, length: int) -> np.ndarray:
+        if length not in self._emas:
+            import pandas_ta as ta
+            ema = ta.ema(self.close, length=length, talib=False)
+            self._emas[length] = ema.to_numpy(dtype=float) if ema is not None else np.full(len(self.close), np.nan)
+        return self._emas[length]
 
 class IndicatorStrategy(ABC):
     @abstractmethod
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
         pass
 
+    def compute(self, context: IndicatorContext) -> dict:
+        """
+        Returns the indicator columns as NumPy arrays aligned with context.df. Strategies
+        override this to share intermediates; the default falls back to calculate().
+        """
+        result = self.calculate(context.df)
+        return {col: result[col].to_numpy() for col in result.columns if col != 'date'}
+
+    def initial_state(self, context: IndicatorContext, rows: int = None):
+        """
+        Returns the state after the first 'rows' candles of context.df (all of them by default),
+        for use with calculate_incremental.
+        """
+        return None
+
+    def calculate_incremental(self, df: pd.DataFrame, state: dict = None):
+        """
+        Returns (indicator DataFrame, new state) for the candles in df. Without a state, df is
+        the whole history; with one, df only holds the candles that follow the ones the state
+        was built from. States are plain JSON-serializable dicts so callers can persist them.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental updates.")
+
+def _ema_state(length: int, close: pd.Series, ema: np.ndarray) -> dict:
+    # Until 'length' closes have been seen the EMA is not seeded yet, so keep the raw closes
+    if len(close) < length:
+        return {'length': length, 'seed': close.tolist(), 'value': None}
+    return {'length': length, 'seed': [], 'value': float(ema[-1])}
+
+def _ema_update(state: dict, closes: np.ndarray):
+    # Mirrors pandas_ta's SMA-seeded ewm(span=length, adjust=False) step by step,
+    # including pandas' float operation order, so results match the batch calculation exactly
+    length = state['length']
+    alpha = 1. / (1. + (length - 1) / 2.0)
+    old_wt = 1. - alpha
+    seed = list(state['seed'])
+    value = state['value']
+    values = np.full(len(closes), np.nan)
+    for i, close in enumerate(closes):
+        if value is None:
+            seed.append(float(close))
+            if len(seed) == length:
+                value = float(pd.Series(seed).mean())
+                seed = []
+        elif value != close:
+            value = (old_wt * value + alpha * close) / (old_wt + alpha)
+        if value is not None:
+            values[i] = value
+    return values, {'length': length, 'seed': seed, 'value': value}
+
 class EmaIndicator(IndicatorStrategy):
     def __init__(self, length: int):
         self.length = length
@@ -14,9 +83,26 @@ class EmaIndicator(IndicatorStrategy):
         import pandas_ta as ta
         if df.empty:
             return pd.DataFrame()
-        ema = ta.ema(df['close'], length=self.length)
+        ema = ta.ema(df['close'], length=self.length, talib=False)
         return pd.DataFrame({'date': df['date'], f'ema_{self.length}': ema})
 
+    def compute(self, context: IndicatorContext) -> dict:
+        return {f'ema_{self.length}': context.ema(self.length)}
+
+    def initial_state(self, context: IndicatorContext, rows: int = None):
+        rows = len(context.close) if rows is None else rows
+        return _ema_state(self.length, context.close.iloc[:rows], context.ema(self.length)[:rows])
+
+    def calculate_incremental(self, df: pd.DataFrame, state: dict = None):
+        if state is None:
+            if df.empty:
+                return pd.DataFrame(), None
+            context = IndicatorContext(df)
+            return pd.DataFrame({'date': df['date'], **self.compute(context)}), self.initial_state(context)
+
+        values, state = _ema_update(state, df['close'].to_numpy(dtype=float))
+        return pd.DataFrame({'date': df['date'], f'ema_{self.length}': values}), state
+
 class MacdIndicator(IndicatorStrategy):
     def __init__(self, fast=12, slow=26, signal=9):
         self.fast = fast
@@ -27,10 +113,32 @@ class MacdIndicator(IndicatorStrategy):
         import pandas_ta as ta
         if df.empty:
             return pd.DataFrame()
-        macd = ta.macd(df['close'], fast=self.fast, slow=self.slow, signal=self.signal)
+        macd = ta.macd(df['close'], fast=self.fast, slow=self.slow, signal=self.signal, talib=False)
         if macd is None or macd.empty:
             return pd.DataFrame()
-        return pd.DataFrame({'date': df['date'], 'macd': macd['MACD_12_26_9']})
+        return pd.DataFrame({'date': df['date'], 'macd': macd[f'MACD_{self.fast}_{self.slow}_{self.signal}']})
+
+    def compute(self, context: IndicatorContext) -> dict:
+        # Same MACD line as pandas_ta.macd, built from EMAs other indicators may already need
+        return {'macd': context.ema(self.fast) - context.ema(self.slow)}
+
+    def initial_state(self, context: IndicatorContext, rows: int = None):
+        # Only the MACD line is emitted, so the state is just the fast and slow EMAs it is built from
+        rows = len(context.close) if rows is None else rows
+        return {'fast': _ema_state(self.fast, context.close.iloc[:rows], context.ema(self.fast)[:rows]),
+                'slow': _ema_state(self.slow, context.close.iloc[:rows], context.ema(self.slow)[:rows])}
+
+    def calculate_incremental(self, df: pd.DataFrame, state: dict = None):
+        if state is None:
+            if df.empty:
+                return pd.DataFrame(), None
+            context = IndicatorContext(df)
+            return pd.DataFrame({'date': df['date'], **self.compute(context)}), self.initial_state(context)
+
+        closes = df['close'].to_numpy(dtype=float)
+        fast_values, fast_state = _ema_update(state['fast'], closes)
+        slow_values, slow_state = _ema_update(state['slow'], closes)
+        return pd.DataFrame({'date': df['date'], 'macd': fast_values - slow_values}), {'fast': fast_state, 'slow': slow_state}
 
 
 class IndicatorRegistry:
@@ -44,3 +152,41 @@ class IndicatorRegistry:
         if name not in self._indicators:
             raise ValueError(f"Indicator '{name}' is not registered.")
         return self._indicators[name]
+
+    def names(self) -> list:
+        return list(self._indicators)
+
+    def calculate_all(self, df: pd.DataFrame, state_rows: int = None):
+        """
+        Computes every registered indicator in one pass. Returns (columns, states): a DataFrame
+        sharing df's index, so it can be attached without merging, and each indicator's state
+        after the first state_rows candles (all of them by default).
+        """
+        context = IndicatorContext(df)
+        columns = {}
+        states = {}
+        for name, indicator in self._indicators.items():
+            # EMAs shared through the context are timed under the first indicator that needs them
+            with metrics.timer('indicator_seconds', indicator=name, mode='full'):
+                columns.update(indicator.compute(context))
+                states[name] = indicator.initial_state(context, state_rows)
+        return pd.DataFrame(columns, index=df.index), states
+
+    def update_all(self, df: pd.DataFrame, states: dict, state_rows: int = None):
+        """
+        Continues every registered indicator from 'states' over df, which holds the candles that
+        follow the ones the states were built from. Returns (columns, states) like calculate_all.
+        """
+        rows = len(df) if state_rows is None else state_rows
+        columns = {}
+        new_states = {}
+        for name, indicator in self._indicators.items():
+            if states.get(name) is None:
+                raise ValueError(f"No saved state for indicator '{name}'.")
+            with metrics.timer('indicator_seconds', indicator=name, mode='incremental'):
+                head, state = indicator.calculate_incremental(df.iloc[:rows], states[name])
+                tail, _ = indicator.calculate_incremental(df.iloc[rows:], state)
+            for col in head.columns.drop('date'):
+                columns[col] = np.concatenate([head[col].to_numpy(dtype=float), tail[col].to_numpy(dtype=float)])
+            new_states[name] = state
+        return pd.DataFrame(columns, index=df.index), new_states
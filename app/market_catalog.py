@@ -0,0 +1,173 @@
+import bisect
+import json
+import os
+import threading
+import time
+from app.request_scheduler import RequestScheduler, INTERACTIVE, request_scheduler as shared_request_scheduler
+
+MARKET_TYPE_FILTERS = {
+    'spot': lambda market: bool(market.get('spot')),
+    'perpetual': lambda market: bool(market.get('swap')) and market.get('linear') is not False
+}
+
+class SymbolIndex:
+    """
+    Lookup table from the ways a user may spell a market (BTCUSDT, BTC/USDT, BTC/USDT:USDT,
+    in any case) to the market itself, plus a sorted key list for prefix autocomplete.
+    """
+    def __init__(self, markets: list):
+        self._by_spelling = {}
+        # Active markets claim a spelling first when several markets share it
+        for market in sorted(markets, key=lambda market: market.get('active') is False):
+            for spelling in self.spellings(market):
+                self._by_spelling.setdefault(self.normalize(spelling), market)
+        self._keys = sorted(self._by_spelling)
+
+    @staticmethod
+    def normalize(spelling: str) -> str:
+        return ''.join(spelling.split()).upper()
+
+    @staticmethod
+    def spellings(market: dict) -> list:
+        spellings = [market['symbol'], market.get('id') or '']
+        base, quote = market.get('base'), market.get('quote')
+        if base and quote:
+            spellings += [f"{base}/{quote}", f"{base}{quote}"]
+        return [spelling for spelling in spellings if spelling]
+
+    def __len__(self):
+        return len(self._by_spelling)
+
+    def symbols(self, quote: str = None) -> list:
+        # Active markets only, optionally with one quote currency
+        markets = {market['symbol']: market for market in self._by_spelling.values()}
+        return sorted(symbol for symbol, market in markets.items()
+                      if market.get('active') is not False and (quote is None or market.get('quote') == quote.upper()))
+
+    def resolve(self, symbol: str):
+        return self._by_spelling.get(self.normalize(symbol))
+
+    def suggest(self, prefix: str, limit: int = 10) -> list:
+        prefix = self.normalize(prefix)
+        suggestions = []
+        position = bisect.bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix) and len(suggestions) < limit:
+            symbol = self._by_spelling[self._keys[position]]['symbol']
+            if symbol not in suggestions:
+                suggestions.append(symbol)
+            position += 1
+        return suggestions
+
+
+class MarketCatalog:
+    """
+    Market metadata per exchange and market type, cached as JSON files under 'directory' for
+    'ttl_seconds'. Cached markets are handed to the exchange with set_markets, so ccxt does not
+    call load_markets again, and a SymbolIndex over them resolves symbols without a round trip.
+    Exchanges without load_markets (e.g. FakeExchange) are passed through unchecked. Loading
+    markets goes through the request scheduler like every other exchange request.
+    """
+    def __init__(self, directory: str, ttl_seconds: int, request_scheduler: RequestScheduler = None):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.request_scheduler = request_scheduler or shared_request_scheduler
+        self._entries = {}
+        self._shared = set()
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+        # One per exchange, so a slow load_markets only holds up lookups on that exchange
+        self._exchange_locks = {}
+
+    def resolve(self, exchange, symbol: str, market_type: str) -> str:
+        """
+        Returns the canonical ccxt symbol for 'symbol', raising ValueError if the exchange has no
+        such market of this type.
+        """
+        index = self.index(exchange, market_type)
+        if index is None:
+            return symbol
+        market = index.resolve(symbol)
+        if market is None:
+            raise ValueError(f"Unknown symbol '{symbol}' for {exchange.id} {market_type} markets.")
+        return market['symbol']
+
+    def suggest(self, exchange, prefix: str, market_type: str, limit: int = 10) -> list:
+        index = self.index(exchange, market_type)
+        return index.suggest(prefix, limit) if index is not None else []
+
+    def symbols(self, exchange, market_type: str, quote: str = None) -> list:
+        index = self.index(exchange, market_type)
+        return index.symbols(quote) if index is not None else []
+
+    def index(self, exchange, market_type: str):
+        if not hasattr(exchange, 'load_markets'):
+            return None
+        key = (exchange.id, market_type)
+        with self._lock:
+            exchange_lock = self._exchange_locks.setdefault(exchange.id, threading.Lock())
+        with exchange_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None or self._expired(entry['fetched_at']):
+                entry = self._load(exchange, market_type)
+                with self._lock:
+                    self._entries[key] = entry
+                    self._shared = {shared for shared in self._shared if shared[1:] != key}
+            with self._lock:
+                shared = (id(exchange),) + key in self._shared
+            if not shared:
+                self._share_markets(exchange, entry['markets'])
+                with self._lock:
+                    self._shared.add((id(exchange),) + key)
+            return entry['index']
+
+    def _load(self, exchange, market_type: str) -> dict:
+        path = self._path(exchange.id, market_type)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                cached = json.load(f)
+            if not self._expired(cached['fetched_at']):
+                return self._entry(cached['markets'], cached['fetched_at'])
+
+        if market_type not in MARKET_TYPE_FILTERS:
+            raise ValueError(f"Unsupported market type: {market_type}")
+        # One load_markets call returns every market type, so a fresh one is reused for the others
+        fetched_at = self._loaded_at.get(id(exchange), 0)
+        reload = self._expired(fetched_at)
+        all_markets = self.request_scheduler.call(exchange.id, 'markets', lambda: exchange.load_markets(reload=reload),
+                                                  INTERACTIVE)
+        if reload:
+            fetched_at = time.time()
+            self._loaded_at[id(exchange)] = fetched_at
+        markets = [market for market in all_markets.values() if MARKET_TYPE_FILTERS[market_type](market)]
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'exchange': exchange.id, 'market_type': market_type, 'fetched_at': fetched_at,
+                       'markets': markets}, f, default=str)
+        os.replace(tmp_path, path)
+        return self._entry(markets, fetched_at)
+
+    @staticmethod
+    def _share_markets(exchange, markets: list):
+        # Added to what the exchange already holds, so other market types stay resolvable
+        known = exchange.markets or {}
+        if any(market['symbol'] not in known for market in markets):
+            exchange.set_markets({**known, **{market['symbol']: market for market in markets}})
+
+    def _expired(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at > self.ttl_seconds
+
+    def _path(self, exchange_id: str, market_type: str) -> str:
+        return os.path.join(self.directory, f"{exchange_id}_{market_type}.json")
+
+    @staticmethod
+    def _entry(markets: list, fetched_at: float) -> dict:
+        return {'markets': markets, 'fetched_at': fetched_at, 'index': SymbolIndex(markets)}
+
+
+def _default_catalog():
+    from config import MARKET_CACHE_DIRECTORY, MARKET_CACHE_TTL_SECONDS
+    return MarketCatalog(MARKET_CACHE_DIRECTORY, MARKET_CACHE_TTL_SECONDS)
+
+market_catalog = _default_catalog()
@@ -1,48 +1,34 @@
 import pandas as pd
 import streamlit as st
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from config import CANDLE_DTYPE, MAX_CONCURRENT_REQUESTS, OHLCV_BATCH_SIZE, SUPPORTED_TIMEFRAMES
+from app.candle_buffer import CandleBuffer, with_local_dates
+from app.candle_store import CandleStore, OHLCV_COLUMNS
+from app.candle_resampler import CandleResampler
+from app.market_catalog import MarketCatalog
+from app.metrics import metrics
+from app.request_scheduler import RequestScheduler, INTERACTIVE, request_scheduler as shared_request_scheduler
 
 class MarketDataFetcher:
-    def __init__(self, exchange, delta_calculator):
+    def __init__(self, exchange, delta_calculator, candle_store: CandleStore = None,
+                 market_catalog: MarketCatalog = None, request_scheduler: RequestScheduler = None,
+                 candle_dtype: str = CANDLE_DTYPE):
         self.exchange = exchange
         self.delta_calculator = delta_calculator
+        self.candle_store = candle_store
+        self.market_catalog = market_catalog
+        # Shared by default, so the rate-limit budget holds across fetchers and sessions
+        self.request_scheduler = request_scheduler or shared_request_scheduler
+        self.candle_dtype = candle_dtype
+        self.resampler = CandleResampler()
 
     def fetch_ohlcv(self, symbol: str, timeframe: str, limit: int, selected_datetime: datetime,
-                    local_tz, market_type: str) -> pd.DataFrame:
+                    local_tz, market_type: str, priority: int = INTERACTIVE) -> pd.DataFrame:
         try:
-            if not hasattr(self.exchange, 'fetchOHLCV'):
-                raise NotImplementedError(
-                    f"The exchange '{self.exchange.id}' does not support OHLCV data fetching."
-                )
-
-            # Always use "before date" calculations
-            delta = self.delta_calculator.calculate_delta(timeframe, limit - 1)
-            adjusted_date = selected_datetime - delta
-            since = int(adjusted_date.timestamp() * 1000)
-
-            fetchOHLCV_params = {}
-            if self.exchange.id == "bybit" and market_type == "perpetual":
-                fetchOHLCV_params = {'category': 'linear'}
-            elif self.exchange.id == "bybit" and market_type == "spot":
-                fetchOHLCV_params = {'category': 'spot'}
-
-            all_data = []
-            while limit > 0:
-                batch_limit = min(limit, 500)  # Maximum number of candles per request
-                data = self.exchange.fetchOHLCV(symbol, timeframe=timeframe, since=since, limit=batch_limit, params=fetchOHLCV_params)
-                if not data:
-                    break
-
-                all_data.extend(data)
-                limit -= len(data)
-                since = data[-1][0] + 1  # Update 'since' to be the timestamp of the last candle + 1ms
-
-            if all_data:
-                df = pd.DataFrame(all_data, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
-                df['date'] = pd.to_datetime(df['date'], unit='ms', utc=True).dt.tz_convert(local_tz).dt.tz_localize(None)
-                return df
-            else:
-                return pd.DataFrame()
+            adjusted_date, end_date = self.window_bounds(timeframe, limit, selected_datetime)
+            return self.fetch_ohlcv_range(symbol, timeframe, adjusted_date, end_date, local_tz, market_type, limit,
+                                          priority)
 
         except ValueError as e:
             st.error(f"Value error: {e}")
@@ -53,3 +39,249 @@ class MarketDataFetcher:
         except Exception as e:
             st.error(f"An error occurred while fetching OHLCV data: {e}")
             return pd.DataFrame()
+
+    def fetch_ohlcv_range(self, symbol: str, timeframe: str, start: datetime, end: datetime,
+                          local_tz, market_type: str, limit: int = None, priority: int = INTERACTIVE) -> pd.DataFrame:
+        """
+        Fetches the candles opening in [start, end), optionally capped at 'limit' candles.
+        Unlike fetch_ohlcv, errors are raised to the caller instead of being shown in the UI.
+        'priority' is the request scheduler lane, INTERACTIVE or BACKGROUND. 'date' holds the
+        candle open times as a column aware of 'local_tz'.
+        """
+        if not hasattr(self.exchange, 'fetchOHLCV'):
+            raise NotImplementedError(
+                f"The exchange '{self.exchange.id}' does not support OHLCV data fetching."
+            )
+
+        symbol = self.resolve_symbol(symbol, market_type)
+        since = int(start.timestamp() * 1000)
+        until = int(end.timestamp() * 1000)
+        with metrics.timer('fetch_seconds', exchange=self.exchange.id, timeframe=timeframe):
+            df = self._fetch_range(symbol, timeframe, since, until, market_type, priority)
+        if limit is not None:
+            df = df.head(limit)
+        if df.empty:
+            return pd.DataFrame()
+        # The epoch milliseconds are kept; the timezone is only attached as metadata
+        return with_local_dates(df, local_tz)
+
+    def window_bounds(self, timeframe: str, limit: int, selected_datetime: datetime) -> tuple:
+        # Always use "before date" calculations: the window ends with the candle opening at selected_datetime
+        delta = self.delta_calculator.calculate_delta(timeframe, limit - 1)
+        adjusted_date = selected_datetime - delta
+        return adjusted_date, adjusted_date + self.delta_calculator.calculate_delta(timeframe, limit)
+
+    def fetch_ohlcv_since(self, symbol: str, timeframe: str, since: datetime, local_tz, market_type: str,
+                          priority: int = INTERACTIVE) -> pd.DataFrame:
+        """
+        Fetches every candle opening at or after 'since', up to and including the one still forming.
+        """
+        end = self.now() + self.delta_calculator.calculate_delta(timeframe, 1)
+        return self.fetch_ohlcv_range(symbol, timeframe, since, end, local_tz, market_type, priority=priority)
+
+    def resolve_symbol(self, symbol: str, market_type: str) -> str:
+        # Unknown symbols raise ValueError here, before any request is sent
+        if self.market_catalog is None:
+            return symbol
+        return self.market_catalog.resolve(self.exchange, symbol, market_type)
+
+    def suggest_symbols(self, prefix: str, market_type: str, limit: int = 10) -> list:
+        if self.market_catalog is None:
+            return []
+        return self.market_catalog.suggest(self.exchange, prefix, market_type, limit)
+
+    def _fetch_range(self, symbol: str, timeframe: str, since: int, end: int, market_type: str,
+                     priority: int) -> pd.DataFrame:
+        if self.candle_store is None:
+            return self._download(symbol, timeframe, [(since, end)], market_type, priority)[0]
+
+        store_key = (self.exchange.id, market_type, symbol, timeframe)
+        gaps = [
+            (gap_start, gap_end) for gap_start, gap_end in self.candle_store.missing_ranges(*store_key, since, end)
+            if not self._resample_from_store(symbol, timeframe, market_type, gap_start, gap_end)
+        ]
+        # The store is shared with float64 readers, so its candles are downloaded at full precision
+        downloaded = self._download(symbol, timeframe, gaps, market_type, priority, 'float64', store_key)
+
+        if gaps == [(since, end)]:
+            # Nothing came from the store, so the downloaded buffer is returned without merging
+            return self._with_candle_dtype(downloaded[0])
+
+        # Freshly downloaded candles win over stored ones, so a still-forming candle is up to date
+        with metrics.timer('store_read_seconds', exchange=self.exchange.id):
+            stored = self.candle_store.read(*store_key, since, end)
+        frames = [frame for frame in [stored] + downloaded if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        df = df.drop_duplicates(subset='date', keep='last').sort_values('date').reset_index(drop=True)
+        return self._with_candle_dtype(df)
+
+    def _with_candle_dtype(self, candles: pd.DataFrame) -> pd.DataFrame:
+        if self.candle_dtype == 'float64':
+            return candles
+        return candles.astype({col: self.candle_dtype for col in OHLCV_COLUMNS[1:]})
+
+    def _resample_from_store(self, symbol: str, timeframe: str, market_type: str, start: int, end: int) -> bool:
+        # Fills the gap from a finer stored series when one fully covers it, coarsest first
+        candidates = [
+            base_timeframe for base_timeframe in SUPPORTED_TIMEFRAMES.get(self.exchange.id, [])
+            if self.resampler.can_resample(base_timeframe, timeframe)
+        ]
+        candidates.sort(key=self.resampler.fixed_width, reverse=True)
+
+        # The base series has to cover every bucket the gap touches, including the one it ends in
+        base_start = int(self.resampler.bucket_starts([start], timeframe)[0])
+        base_end = int(self.resampler.bucket_ends([end - 1], timeframe)[0])
+        for base_timeframe in candidates:
+            base_key = (self.exchange.id, market_type, symbol, base_timeframe)
+            if self.candle_store.missing_ranges(*base_key, base_start, base_end):
+                continue
+            with metrics.timer('resample_seconds', exchange=self.exchange.id, timeframe=timeframe):
+                candles = self.resampler.resample(self.candle_store.read(*base_key, base_start, base_end), timeframe)
+            candles = candles[(candles['date'] >= start) & (candles['date'] < end)]
+            self.candle_store.write(self.exchange.id, market_type, symbol, timeframe, candles, start, end)
+            return True
+        return False
+
+    def _download(self, symbol: str, timeframe: str, ranges: list, market_type: str, priority: int,
+                  dtype: str = None, store_key: tuple = None) -> list:
+        """
+        Returns one frame per range. With a 'store_key', each window is written to the candle
+        store as soon as it finishes, so a fetch that fails or is interrupted part way keeps
+        the windows that did arrive.
+        """
+        fetchOHLCV_params = {}
+        if self.exchange.id == "bybit" and market_type == "perpetual":
+            fetchOHLCV_params = {'category': 'linear'}
+        elif self.exchange.id == "bybit" and market_type == "spot":
+            fetchOHLCV_params = {'category': 'spot'}
+
+        # Plan every request window up front so they can run side by side
+        windows = []
+        for range_index, (range_start, range_end) in enumerate(ranges):
+            batches = self.delta_calculator.plan_batches(
+                timeframe, self._to_datetime(range_start), self._to_datetime(range_end), OHLCV_BATCH_SIZE
+            )
+            for window_start, window_end, candle_count in batches:
+                windows.append((range_index, int(window_start.timestamp() * 1000),
+                                int(window_end.timestamp() * 1000), candle_count))
+
+        # Each range gets one buffer and each window a fixed slot in it, so pages land in place
+        buffers = []
+        positions = []
+        for range_index in range(len(ranges)):
+            range_windows = [window for window in windows if window[0] == range_index]
+            buffers.append(CandleBuffer(sum(window[3] for window in range_windows), dtype or self.candle_dtype))
+            offsets = [0]
+            for window in range_windows[:-1]:
+                offsets.append(offsets[-1] + window[3])
+            positions.extend(offsets)
+
+        def fetch_window(window, position):
+            range_index, window_start, window_end, candle_count = window
+            count, complete = self._fetch_window(symbol, timeframe, window_start, window_end, candle_count,
+                                                 fetchOHLCV_params, priority, buffers[range_index], position)
+            if store_key is not None:
+                candles = buffers[range_index].to_frame(start=position, stop=position + count)
+                self._store_window(store_key, timeframe, candles, window_start, window_end, complete)
+            return count
+
+        if len(windows) > 1:
+            max_workers = min(len(windows), MAX_CONCURRENT_REQUESTS.get(self.exchange.id, 1))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                counts = list(executor.map(fetch_window, windows, positions))
+        else:
+            counts = [fetch_window(window, position) for window, position in zip(windows, positions)]
+
+        # Close the gaps short windows left, in window order, dropping candles repeated at the edges
+        segments = [[] for _ in ranges]
+        for (range_index, _, _, _), position, count in zip(windows, positions, counts):
+            segments[range_index].append((position, count))
+        frames = []
+        for buffer, range_segments in zip(buffers, segments):
+            buffer.compact(range_segments)
+            frames.append(buffer.to_frame())
+        return frames
+
+    def _store_window(self, store_key: tuple, timeframe: str, candles: pd.DataFrame, start: int, end: int,
+                      complete: bool):
+        # A window that stopped early is only covered up to the last candle it received
+        received_end = end if complete else (int(candles['date'].iloc[-1]) + 1 if len(candles) else start)
+        closed_candles, covered_end = self._split_forming_candle(candles, timeframe, start, end)
+        with metrics.timer('store_write_seconds', exchange=self.exchange.id):
+            self.candle_store.write(*store_key, closed_candles, start, min(covered_end, received_end))
+
+    def _fetch_window(self, symbol: str, timeframe: str, since: int, end: int, candle_count: int, params: dict,
+                      priority: int, buffer: CandleBuffer, position: int) -> tuple[int, bool]:
+        """
+        Downloads the window into buffer[position:position + candle_count] and returns the number
+        of candles written and whether the window was paged through to its end.
+        """
+        written = 0
+        pages = 0
+        complete = False
+        while True:
+            if since >= end or written >= candle_count:
+                complete = True
+                break
+            # Exchanges may cap pages below the limit asked for, so a short page does not end the window
+            data = self._request_page(symbol, timeframe, since, candle_count - written, params, priority)
+            pages += 1
+            if not data or data[-1][0] < since:
+                break
+
+            written += buffer.write(position + written, data, end, candle_count - written)
+            since = data[-1][0] + 1  # Update 'since' to be the timestamp of the last candle + 1ms
+        metrics.observe('pages_per_window', pages, exchange=self.exchange.id)
+        return written, complete
+
+    def _request_page(self, symbol: str, timeframe: str, since: int, limit: int, params: dict, priority: int) -> list:
+        labels = {'exchange': self.exchange.id, 'timeframe': timeframe}
+
+        def request():
+            try:
+                with metrics.timer('exchange_request_seconds', **labels):
+                    data = self.exchange.fetchOHLCV(symbol, timeframe=timeframe, since=since, limit=limit, params=params)
+            except Exception as e:
+                metrics.increment('exchange_errors', exchange=self.exchange.id, error=type(e).__name__)
+                raise
+            # ccxt keeps the raw body of the last response; with parallel windows it may belong to a neighbour
+            return data, getattr(self.exchange, 'last_http_response', None)
+
+        data, response = self.request_scheduler.call(self.exchange.id, 'ohlcv', request, priority)
+        metrics.increment('exchange_requests', **labels)
+        metrics.increment('candles_received', len(data or []), **labels)
+        metrics.observe('candles_per_request', len(data or []), **labels)
+        if response:
+            metrics.increment('bytes_received', len(response), exchange=self.exchange.id)
+        return data
+
+    def now(self) -> datetime:
+        # ccxt exchanges expose their clock through milliseconds()
+        if hasattr(self.exchange, 'milliseconds'):
+            return self._to_datetime(self.exchange.milliseconds())
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def _to_datetime(timestamp: int) -> datetime:
+        return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+
+    def _split_forming_candle(self, candles: pd.DataFrame, timeframe: str, start: int, end: int):
+        # Only closed candles are stored; coverage stops where the first still-open candle begins
+        now = self.now()
+        closed_count = len(candles)
+        while closed_count > 0:
+            open_time = self._to_datetime(candles['date'].iloc[closed_count - 1])
+            if open_time + self.delta_calculator.calculate_delta(timeframe, 1) <= now:
+                break
+            closed_count -= 1
+
+        if closed_count < len(candles):
+            covered_end = int(candles['date'].iloc[closed_count])
+        elif end > now.timestamp() * 1000:
+            # The exchange returned no open candle, so nothing past the last closed one is known yet
+            covered_end = int(candles['date'].iloc[-1]) + 1 if closed_count else start
+        else:
+            covered_end = end
+        return candles.iloc[:closed_count], covered_end
@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class MetricsRegistry:
+    """
+    Process-wide counters, gauges and summaries (count, sum and max of observed values, e.g.
+    durations in seconds or candles per request), labelled like Prometheus metrics. Every update
+    is also logged as a JSON line at DEBUG level on the 'app.metrics' logger.
+    """
+    def __init__(self, prefix: str = 'cryptodata'):
+        self.prefix = prefix
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._log('counter', name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+        self._log('gauge', name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+        self._log('summary', name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        """
+        Returns {'counters': [...], 'gauges': [...], 'summaries': [...]}, one dict per metric and
+        label set.
+        """
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            gauges = [{'name': name, 'labels': dict(labels), 'value': value}
+                      for (name, labels), value in sorted(self._gauges.items())]
+            summaries = [{'name': name, 'labels': dict(labels), 'count': count, 'sum': total, 'max': maximum}
+                         for (name, labels), (count, total, maximum) in sorted(self._summaries.items())]
+        return {'counters': counters, 'gauges': gauges, 'summaries': summaries}
+
+    def to_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format: counters get a _total
+        suffix, summaries a _count and _sum series plus a _max gauge.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for metric in self._by_name(snapshot['counters']):
+            name = f"{self.prefix}_{metric[0]['name']}_total"
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{self._labels(entry['labels'])} {entry['value']:g}" for entry in metric]
+        for metric in self._by_name(snapshot['gauges']):
+            name = f"{self.prefix}_{metric[0]['name']}"
+            lines.append(f"# TYPE {name} gauge")
+            lines += [f"{name}{self._labels(entry['labels'])} {entry['value']:g}" for entry in metric]
+        for metric in self._by_name(snapshot['summaries']):
+            name = f"{self.prefix}_{metric[0]['name']}"
+            lines.append(f"# TYPE {name} summary")
+            for entry in metric:
+                labels = self._labels(entry['labels'])
+                lines.append(f"{name}_count{labels} {entry['count']}")
+                lines.append(f"{name}_sum{labels} {entry['sum']:g}")
+            lines.append(f"# TYPE {name}_max gauge")
+            lines += [f"{name}_max{self._labels(entry['labels'])} {entry['max']:g}" for entry in metric]
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+    @staticmethod
+    def _by_name(entries: list) -> list:
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry['name'], []).append(entry)
+        return list(groups.values())
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if not labels:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+        return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+    @staticmethod
+    def _log(kind: str, name: str, value: float, labels: dict):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({'metric': name, 'type': kind, 'value': value, **labels}, default=str))
+
+
+metrics = MetricsRegistry()
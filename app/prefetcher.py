@@ -0,0 +1,78 @@
+import logging
+import threading
+from collections import OrderedDict
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """
+    Runs speculative fetches on one background thread, shared by every session of the process.
+    Each session ('owner') has its own list of pending jobs, which schedule() replaces and
+    cancel() drops, so jobs for inputs the user has moved away from never start. A job that is
+    already running finishes; anything asking for the same result meanwhile waits on it through
+    the result cache instead of fetching again. Owners take turns, one job at a time.
+    """
+    def __init__(self):
+        self._pending = OrderedDict()
+        self._scheduled = {}
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, owner: str, jobs: dict):
+        """
+        Replaces the owner's pending jobs with 'jobs', a dict of job key to callable. Scheduling
+        the same keys again, as every rerun of an unchanged page does, changes nothing, and an
+        empty dict cancels.
+        """
+        if not jobs:
+            self.cancel(owner)
+            return
+        with self._condition:
+            if self._scheduled.get(owner) == list(jobs):
+                return
+            self._scheduled[owner] = list(jobs)
+            self._pending[owner] = OrderedDict(jobs)
+            metrics.increment('prefetch_scheduled', len(jobs))
+            self._report_depth()
+            if self._thread is None:
+                # Started on first use, so importing the module costs nothing
+                self._thread = threading.Thread(target=self._run, name='prefetcher', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self, owner: str):
+        with self._condition:
+            self._scheduled.pop(owner, None)
+            cancelled = self._pending.pop(owner, None)
+            if cancelled:
+                metrics.increment('prefetch_cancelled', len(cancelled))
+                self._report_depth()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                owner, jobs = self._pending.popitem(last=False)
+                if not jobs:
+                    continue
+                key, job = jobs.popitem(last=False)
+                if jobs:
+                    # Back of the line, so other sessions get a turn
+                    self._pending[owner] = jobs
+                self._report_depth()
+
+            try:
+                with metrics.timer('prefetch_seconds'):
+                    job()
+                metrics.increment('prefetch_jobs', result='completed')
+            except Exception as e:
+                metrics.increment('prefetch_jobs', result='failed')
+                logger.debug("Prefetch of %s failed: %s", key, e)
+
+    def _report_depth(self):
+        metrics.set_gauge('prefetch_queue_depth', sum(len(jobs) for jobs in self._pending.values()))
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,181 @@
+import threading
+import time
+from contextlib import contextmanager
+from app.metrics import metrics
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANE_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+class TokenBucket:
+    """
+    Holds up to 'capacity' units of request weight and refills 'refill_per_second' units per
+    second. Callers check time_until() and only take() once enough weight is available.
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def time_until(self, weight: float, now: float) -> float:
+        self._refill(now)
+        # A request heavier than the whole bucket waits for a full bucket instead of forever
+        missing = min(weight, self.capacity) - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def take(self, weight: float, now: float):
+        self._refill(now)
+        self.tokens -= min(weight, self.capacity)
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+
+class _ExchangeQueue:
+    def __init__(self, max_concurrent: int):
+        self.condition = threading.Condition()
+        self.max_concurrent = max_concurrent
+        self.buckets = {}
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.in_flight = 0
+        self.backoff = 0.0
+        self.backoff_until = 0.0
+
+
+class RequestScheduler:
+    """
+    Gate every exchange request passes through, shared by all fetchers and sessions of the
+    process. Per exchange it caps concurrent requests and keeps a weight-aware token bucket per
+    endpoint. Background requests (bulk downloads, prefetching) only go out while no interactive
+    request is waiting, and leave 'background_reserve' of each bucket to interactive ones. When
+    the exchange pushes back with RateLimitExceeded or DDoSProtection, the exchange is paused for
+    an exponentially growing backoff, the bucket is emptied and the request is retried;
+    successful requests shrink the backoff again.
+    """
+    def __init__(self, rate_limits: dict, max_concurrent: dict, backoff_seconds: tuple = (1.0, 60.0),
+                 max_retries: int = 5, background_reserve: float = 0.0):
+        self.rate_limits = rate_limits
+        self.max_concurrent = max_concurrent
+        self.min_backoff, self.max_backoff = backoff_seconds
+        self.max_retries = max_retries
+        self.background_reserve = background_reserve
+        self._queues = {}
+        self._queues_guard = threading.Lock()
+
+    def call(self, exchange_id: str, endpoint: str, request, priority: int = INTERACTIVE):
+        """
+        Runs request() once the budget allows, retrying it after a backoff when the exchange
+        reports a rate limit. Other errors are raised unchanged.
+        """
+        import ccxt
+        attempt = 0
+        while True:
+            with self.slot(exchange_id, endpoint, priority) as pushback:
+                try:
+                    return request()
+                except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+                    pushback()
+                    attempt += 1
+                    metrics.increment('scheduler_pushbacks', exchange=exchange_id, endpoint=endpoint)
+                    if attempt > self.max_retries:
+                        raise
+
+    @contextmanager
+    def slot(self, exchange_id: str, endpoint: str, priority: int = INTERACTIVE):
+        """
+        Waits for a concurrency slot and the endpoint's weight, then yields a callable the caller
+        invokes if the exchange pushed back on the request.
+        """
+        queue = self._queue(exchange_id)
+        limits = self.rate_limits.get(exchange_id, {}).get(endpoint)
+        weight = limits['weight'] if limits else 0
+        lane = LANE_NAMES[priority]
+        pushed_back = []
+
+        enqueued = time.monotonic()
+        with queue.condition:
+            queue.waiting[priority] += 1
+            self._report_depth(exchange_id, queue)
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = self._time_until_ready(queue, endpoint, limits, weight, priority, now)
+                    if timeout == 0:
+                        break
+                    queue.condition.wait(timeout)
+            finally:
+                queue.waiting[priority] -= 1
+            if limits:
+                self._bucket(queue, endpoint, limits).take(weight, now)
+            queue.in_flight += 1
+            self._report_depth(exchange_id, queue)
+        metrics.observe('scheduler_wait_seconds', time.monotonic() - enqueued, exchange=exchange_id, lane=lane)
+
+        try:
+            yield lambda: pushed_back.append(True)
+        finally:
+            with queue.condition:
+                queue.in_flight -= 1
+                now = time.monotonic()
+                if pushed_back:
+                    queue.backoff = min(self.max_backoff, max(self.min_backoff, queue.backoff * 2))
+                    queue.backoff_until = now + queue.backoff
+                    for bucket in queue.buckets.values():
+                        bucket.drain(now)
+                elif queue.backoff:
+                    queue.backoff = queue.backoff / 2 if queue.backoff / 2 >= self.min_backoff else 0.0
+                metrics.set_gauge('scheduler_backoff_seconds', queue.backoff, exchange=exchange_id)
+                self._report_depth(exchange_id, queue)
+                queue.condition.notify_all()
+
+    def _time_until_ready(self, queue: _ExchangeQueue, endpoint: str, limits: dict, weight: float,
+                          priority: int, now: float):
+        """
+        Returns 0 when the request may go out now, otherwise how long to wait before checking
+        again (None to wait until another request finishes).
+        """
+        if any(queue.waiting[lane] for lane in queue.waiting if lane < priority):
+            return None
+        if now < queue.backoff_until:
+            return queue.backoff_until - now
+        if queue.in_flight >= queue.max_concurrent:
+            return None
+        if limits:
+            reserve = limits['capacity'] * self.background_reserve if priority > INTERACTIVE else 0
+            wait = self._bucket(queue, endpoint, limits).time_until(weight + reserve, now)
+            if wait > 0:
+                return wait
+        return 0
+
+    def _queue(self, exchange_id: str) -> _ExchangeQueue:
+        with self._queues_guard:
+            if exchange_id not in self._queues:
+                self._queues[exchange_id] = _ExchangeQueue(self.max_concurrent.get(exchange_id, 1))
+            return self._queues[exchange_id]
+
+    @staticmethod
+    def _bucket(queue: _ExchangeQueue, endpoint: str, limits: dict) -> TokenBucket:
+        if endpoint not in queue.buckets:
+            queue.buckets[endpoint] = TokenBucket(limits['capacity'], limits['refill_per_second'])
+        return queue.buckets[endpoint]
+
+    @staticmethod
+    def _report_depth(exchange_id: str, queue: _ExchangeQueue):
+        for priority, waiting in queue.waiting.items():
+            metrics.set_gauge('scheduler_queue_depth', waiting, exchange=exchange_id, lane=LANE_NAMES[priority])
+        metrics.set_gauge('scheduler_in_flight', queue.in_flight, exchange=exchange_id)
+
+
+def _default_scheduler():
+    from config import (RATE_LIMITS, MAX_CONCURRENT_REQUESTS, RATE_LIMIT_BACKOFF_SECONDS, RATE_LIMIT_RETRIES,
+                        RATE_LIMIT_BACKGROUND_RESERVE)
+    return RequestScheduler(RATE_LIMITS, MAX_CONCURRENT_REQUESTS, RATE_LIMIT_BACKOFF_SECONDS, RATE_LIMIT_RETRIES,
+                            RATE_LIMIT_BACKGROUND_RESERVE)
+
+request_scheduler = _default_scheduler()
@@ -0,0 +1,123 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from app.metrics import metrics
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """
+    Process-wide LRU cache for fetch and indicator results. Entries expire after their TTL and
+    the least recently used ones are evicted once the estimated size passes 'max_bytes'.
+    Concurrent calls for a key that is being computed wait for that computation instead of
+    starting their own. None and empty DataFrames are returned but never stored, so failed
+    fetches are retried. Cached values are shared between callers and must not be modified.
+    Results that include a still-forming candle expire after 'forming_ttl_seconds' instead.
+    """
+    def __init__(self, max_bytes: int, ttl_seconds: float, forming_ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.forming_ttl_seconds = forming_ttl_seconds
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute, forming: bool = False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment('cache_requests', result='hit')
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.collapsed += 1
+            metrics.increment('cache_requests', result='miss' if leader else 'collapsed')
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self._store(key, flight.value, self.forming_ttl_seconds if forming else self.ttl_seconds)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'collapsed': self.collapsed,
+                    'evictions': self.evictions, 'entries': len(self._entries), 'bytes': self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, value, ttl_seconds: float):
+        if ttl_seconds <= 0 or value is None or (isinstance(value, pd.DataFrame) and value.empty):
+            return
+        size = self.estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+                metrics.increment('cache_evictions')
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    @classmethod
+    def estimate_size(cls, value) -> int:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, pd.Series):
+            return int(value.memory_usage(deep=True))
+        if isinstance(value, (tuple, list)):
+            return sys.getsizeof(value) + sum(cls.estimate_size(item) for item in value)
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(cls.estimate_size(item) for item in value.values())
+        return sys.getsizeof(value)
+
+
+def _default_cache():
+    from config import RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_FORMING_TTL_SECONDS
+    return ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_FORMING_TTL_SECONDS)
+
+result_cache = _default_cache()
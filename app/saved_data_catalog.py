@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from app.csv_index import CsvTimeIndex
+from app.data_loader import LOADERS
+from app.data_saver import METADATA_KEY, MANIFEST_NAME, read_manifest, read_sidecar
+
+logger = logging.getLogger(__name__)
+
+# [exchange_market_type_]symbol_timeframe_date_time[_date_time], as written by the app and bulk downloads
+FILENAME_PATTERN = re.compile(
+    r'^(?P<head>.+)_(?P<timeframe>\d+[mhdwM])_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(?:_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})?$'
+)
+MARKET_TYPES = ('spot', 'perpetual')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    exchange TEXT,
+    market_type TEXT,
+    symbol TEXT,
+    symbol_key TEXT,
+    timeframe TEXT,
+    timezone TEXT,
+    first_ms INTEGER,
+    last_ms INTEGER,
+    row_count INTEGER NOT NULL,
+    csv_index TEXT
+);
+CREATE INDEX IF NOT EXISTS files_by_series ON files (symbol_key, timeframe, first_ms, last_ms);
+"""
+
+def symbol_key(symbol: str) -> str:
+    # BTCUSDT, BTC/USDT, BTC_USDT and BTC/USDT:USDT all become BTCUSDT
+    return re.sub(r'[^A-Z0-9]', '', symbol.split(':')[0].upper())
+
+def _to_ms(timestamp) -> int:
+    # Saved dates are naive local wall times, stored here as if they were UTC
+    return pd.Timestamp(timestamp).value // 1_000_000
+
+class SavedDataCatalog:
+    """
+    SQLite index over the data files in 'directory': exchange, market type, symbol, timeframe,
+    timezone, first and last candle time and row count per file, plus the sparse time index of
+    CSV files. Parquet and Feather files take these from their embedded metadata and CSV files
+    from the JSON file saved next to them; files without metadata fall back to the symbol and
+    timeframe in the file name. refresh() only re-reads files that are new or changed since the
+    last scan, and query() calls it first.
+    """
+    def __init__(self, directory: str, index_path: str, csv_chunk_rows: int = 100_000):
+        self.directory = directory
+        self.index_path = index_path
+        self.csv_chunk_rows = csv_chunk_rows
+        self._lock = threading.Lock()
+
+    def refresh(self) -> int:
+        """
+        Brings the index in line with the directory and returns the number of files (re)indexed.
+        """
+        with self._lock, closing(self._connect()) as connection, connection:
+            known = {row[0]: (row[1], row[2]) for row in connection.execute("SELECT path, size, mtime_ns FROM files")}
+            found = set()
+            indexed = 0
+            for path, stat in self._scan():
+                found.add(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   self._describe(path, stat))
+                indexed += 1
+            connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in set(known) - found])
+            return indexed
+
+    def datasets(self) -> pd.DataFrame:
+        self.refresh()
+        with closing(self._connect()) as connection:
+            files = pd.read_sql_query(
+                "SELECT path, format, exchange, market_type, symbol, timeframe, timezone, first_ms, last_ms, row_count "
+                "FROM files WHERE row_count > 0 ORDER BY symbol_key, timeframe, first_ms", connection
+            )
+        for col in ('first_ms', 'last_ms'):
+            files[col.replace('_ms', '')] = pd.to_datetime(files.pop(col), unit='ms')
+        return files
+
+    def query(self, symbol: str, timeframe: str, start, end, exchange: str = None, market_type: str = None,
+              timezone: str = None) -> pd.DataFrame:
+        """
+        Returns the saved candles with start <= date <= end as one frame sorted by date. Where
+        files overlap, rows from the most recently written file win. Dates are local wall times
+        as saved, so files saved in different timezones can only be combined by picking one
+        with 'timezone'.
+        """
+        self.refresh()
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        conditions = ["symbol_key = ?", "timeframe = ?", "row_count > 0", "last_ms >= ?", "first_ms <= ?"]
+        parameters = [symbol_key(symbol), timeframe, _to_ms(start), _to_ms(end)]
+        for column, value in (('exchange', exchange), ('market_type', market_type)):
+            if value is not None:
+                # Files without metadata do not record these, so they match any value
+                conditions.append(f"({column} = ? OR {column} IS NULL)")
+                parameters.append(value)
+        if timezone is not None:
+            # Dates of a file with an unknown timezone cannot be assumed to be in this one
+            conditions.append("timezone = ?")
+            parameters.append(timezone)
+        with closing(self._connect()) as connection:
+            files = connection.execute(
+                f"SELECT path, format, timezone, csv_index FROM files WHERE {' AND '.join(conditions)} ORDER BY mtime_ns",
+                parameters
+            ).fetchall()
+
+        timezones = {file_timezone for _, _, file_timezone, _ in files if file_timezone}
+        if len(timezones) > 1:
+            raise ValueError(f"Matching files were saved in different timezones ({', '.join(sorted(timezones))}); "
+                             f"pick one with 'timezone'.")
+
+        frames = [self._read_range(path, file_format, csv_index, start, end)
+                  for path, file_format, _, csv_index in files]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, ignore_index=True)
+        data = data.drop_duplicates(subset='date', keep='last').sort_values('date', kind='stable')
+        return data.reset_index(drop=True)
+
+    def _read_range(self, path: str, file_format: str, csv_index: str, start: pd.Timestamp,
+                    end: pd.Timestamp) -> pd.DataFrame:
+        full_path = os.path.join(self.directory, path)
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            # Row groups whose statistics fall outside the range are skipped without being read
+            return pq.read_table(full_path, filters=[('date', '>=', start), ('date', '<=', end)],
+                                 memory_map=True).to_pandas()
+        if file_format in ('feather', 'arrow'):
+            import pyarrow.feather as feather
+            table = feather.read_table(full_path, memory_map=True)
+            # Dates are sorted, so each batch's binary search counts the rows before the bounds
+            batches = [chunk.to_numpy() for chunk in table.column('date').chunks]
+            first = sum(int(np.searchsorted(dates, np.datetime64(start), 'left')) for dates in batches)
+            last = sum(int(np.searchsorted(dates, np.datetime64(end), 'right')) for dates in batches)
+            return table.slice(first, last - first).to_pandas()
+
+        index = self._csv_index(json.loads(csv_index))
+        with open(full_path, 'rb') as f:
+            chunks = list(index.read_range(f, start, end, self.csv_chunk_rows))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+    def _describe(self, path: str, stat: os.stat_result) -> tuple:
+        file_format = os.path.splitext(path)[1].lstrip('.').lower()
+        full_path = os.path.join(self.directory, path)
+        metadata = {}
+        first = last = None
+        row_count = 0
+        csv_index = None
+        try:
+            if file_format == 'parquet':
+                metadata, first, last, row_count = self._describe_parquet(full_path)
+            elif file_format in ('feather', 'arrow'):
+                metadata, first, last, row_count = self._describe_feather(full_path)
+            else:
+                metadata = read_sidecar(full_path)
+                with open(full_path, 'rb') as f:
+                    index = CsvTimeIndex.build(f, self.csv_chunk_rows)
+                first, last, row_count = index.first_date, index.last_date, index.row_count
+                if first is not None:
+                    csv_index = json.dumps(self._csv_index_state(index))
+        except Exception as e:
+            # Recorded without rows, so it is skipped until the file changes
+            logger.warning("Could not index %s: %s", full_path, e)
+
+        symbol = metadata.get('symbol')
+        timeframe = metadata.get('timeframe')
+        exchange = metadata.get('exchange')
+        market_type = metadata.get('market_type')
+        match = FILENAME_PATTERN.match(os.path.splitext(os.path.basename(path))[0])
+        if match and (symbol is None or timeframe is None):
+            head = match.group('head').split('_')
+            if len(head) > 2 and head[1] in MARKET_TYPES:
+                exchange, market_type = exchange or head[0], market_type or head[1]
+                symbol = symbol or '/'.join(head[2:4])
+            else:
+                # Anything before the symbol is the user's filename prefix
+                symbol = symbol or head[-1]
+            timeframe = timeframe or match.group('timeframe')
+
+        return (path, stat.st_size, stat.st_mtime_ns, file_format, exchange, market_type, symbol,
+                symbol_key(symbol) if symbol else None, timeframe, metadata.get('timezone'),
+                _to_ms(first) if first is not None else None, _to_ms(last) if last is not None else None,
+                row_count if first is not None else 0, csv_index)
+
+    @staticmethod
+    def _describe_parquet(path: str):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        column = parquet_file.schema_arrow.get_field_index('date')
+        first = last = None
+        for row_group in range(parquet_file.num_row_groups):
+            statistics = parquet_file.metadata.row_group(row_group).column(column).statistics
+            if statistics is None or not statistics.has_min_max:
+                dates = parquet_file.read_row_group(row_group, columns=['date']).column('date')
+                statistics_min, statistics_max = dates[0].as_py(), dates[-1].as_py()
+            else:
+                statistics_min, statistics_max = statistics.min, statistics.max
+            first = statistics_min if first is None else min(first, statistics_min)
+            last = statistics_max if last is None else max(last, statistics_max)
+        return _embedded_metadata(parquet_file.schema_arrow), first, last, parquet_file.metadata.num_rows
+
+    @staticmethod
+    def _describe_feather(path: str):
+        import pyarrow.compute as pc
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        bounds = pc.min_max(table.column('date'))
+        return (_embedded_metadata(table.schema), bounds['min'].as_py(), bounds['max'].as_py(), table.num_rows)
+
+    @staticmethod
+    def _csv_index_state(index: CsvTimeIndex) -> dict:
+        return {'columns': index.columns, 'date_column': index.date_column, 'offsets': index.offsets,
+                'dates': [_to_ms(date) for date in index.dates], 'row_count': index.row_count,
+                'last_date': _to_ms(index.last_date), 'chunk_rows': index.chunk_rows}
+
+    @staticmethod
+    def _csv_index(state: dict) -> CsvTimeIndex:
+        return CsvTimeIndex(state['columns'], state['date_column'], state['offsets'],
+                            [pd.Timestamp(date, unit='ms') for date in state['dates']], state['row_count'],
+                            pd.Timestamp(state['last_date'], unit='ms'), state['chunk_rows'])
+
+    def _scan(self):
+        if not os.path.isdir(self.directory):
+            return
+        for root, dirnames, filenames in os.walk(self.directory):
+            if MANIFEST_NAME in filenames:
+                # A DatasetSaver dataset: only the segments its manifest lists, in the order they were written
+                dirnames.clear()
+                manifest = read_manifest(root)
+                filenames = [segment['file'] for segment in manifest['segments']]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lstrip('.').lower() in LOADERS:
+                    full_path = os.path.join(root, filename)
+                    yield os.path.relpath(full_path, self.directory), os.stat(full_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        connection = sqlite3.connect(self.index_path)
+        connection.executescript(SCHEMA)
+        return connection
+
+
+def _embedded_metadata(schema) -> dict:
+    metadata = (schema.metadata or {}).get(METADATA_KEY)
+    return json.loads(metadata) if metadata else {}
@@ -0,0 +1,206 @@
+import logging
+import math
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timezone
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from app.candle_buffer import VALUE_COLUMNS
+from app.indicators import IndicatorRegistry
+from app.market_data_fetcher import MarketDataFetcher
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONDITION_PATTERN = re.compile(r'^\s*(\S+)\s+(crosses above|crosses below|>=|<=|>|<)\s+(\S+)\s*$')
+
+@dataclass(frozen=True)
+class Condition:
+    """
+    One screening rule on the last candles of a symbol, e.g. 'ema_10 crosses above ema_20' or
+    'close > 20000'. Operands are candle columns, indicator columns or numbers.
+    """
+    left: str
+    operator: str
+    right: str
+
+    @classmethod
+    def parse(cls, text: str) -> 'Condition':
+        match = CONDITION_PATTERN.match(text)
+        if match is None:
+            raise ValueError(f"Invalid condition '{text}'. Expected '<operand> <operator> <operand>' with one of "
+                             f">, <, >=, <=, crosses above, crosses below.")
+        return cls(*match.groups())
+
+    def __str__(self):
+        return f"{self.left} {self.operator} {self.right}"
+
+    def evaluate(self, columns: dict) -> tuple:
+        """
+        Returns (passed, strength) for the last candle, where strength is how far the left operand
+        is past the right one, relative to the right one, in the direction the operator asks for.
+        """
+        left, right = self._operand(self.left, columns), self._operand(self.right, columns)
+        if len(left) < 2 or np.isnan(left[-2:]).any() or np.isnan(right[-2:]).any():
+            return False, math.nan
+        difference = left[-1] - right[-1]
+        if self.operator in ('<', '<=', 'crosses below'):
+            difference = -difference
+        strength = difference / abs(right[-1]) if right[-1] else difference
+
+        if self.operator == 'crosses above':
+            passed = left[-2] <= right[-2] and left[-1] > right[-1]
+        elif self.operator == 'crosses below':
+            passed = left[-2] >= right[-2] and left[-1] < right[-1]
+        else:
+            passed = {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal}[self.operator](
+                left[-1], right[-1])
+        return bool(passed), float(strength)
+
+    @staticmethod
+    def _operand(operand: str, columns: dict) -> np.ndarray:
+        if operand in columns:
+            return columns[operand]
+        try:
+            return np.full(2, float(operand))
+        except ValueError:
+            raise ValueError(f"Unknown column '{operand}'. Available columns: {', '.join(columns)}") from None
+
+
+class Screener:
+    """
+    Evaluates conditions on the registered indicators across many symbols. Candles are fetched
+    on threads, then packed into one shared memory block: dates as int64 and the OHLCV values as
+    a (5, total rows) float64 array, each symbol a span of columns. Worker processes attach to
+    the block once and compute indicators on zero-copy views of their spans, so only span
+    bounds go to the workers and only the last values come back. Indicators run outside the
+    GIL of the calling process, one process per core by default.
+    """
+    def __init__(self, fetcher: MarketDataFetcher, indicator_registry: IndicatorRegistry, workers: int = None,
+                 fetch_workers: int = 8):
+        self.fetcher = fetcher
+        self.indicator_registry = indicator_registry
+        self.workers = workers or os.cpu_count() or 1
+        self.fetch_workers = fetch_workers
+
+    def screen(self, symbols: list, timeframe: str, limit: int, market_type: str, conditions: list,
+               rank_by: str = None) -> pd.DataFrame:
+        """
+        Returns one row per symbol with the last closed candle's close, the value of every column
+        the conditions use, each condition's strength and whether all of them passed. Passing
+        symbols come first, ranked by 'rank_by' (a column) or else by the first condition's
+        strength.
+        """
+        conditions = [Condition.parse(condition) if isinstance(condition, str) else condition
+                      for condition in conditions]
+        with metrics.timer('screener_seconds', stage='fetch'):
+            candles = self.load(symbols, timeframe, limit, market_type)
+        if not candles:
+            return pd.DataFrame()
+
+        total = sum(len(frame) for frame in candles.values())
+        block = shared_memory.SharedMemory(create=True, size=max(1, total * 8 * (1 + len(VALUE_COLUMNS))))
+        try:
+            dates, values = _views(block, total)
+            spans = []
+            position = 0
+            for symbol, frame in candles.items():
+                dates[position:position + len(frame)] = frame['date'].dt.as_unit('ms').array.asi8
+                values[:, position:position + len(frame)] = frame[VALUE_COLUMNS].to_numpy(dtype=np.float64).T
+                spans.append((symbol, position, position + len(frame)))
+                position += len(frame)
+            del dates, values
+
+            # A few tasks per worker evens out symbols with more or fewer candles
+            task_size = max(1, math.ceil(len(spans) / (self.workers * 4)))
+            tasks = [spans[i:i + task_size] for i in range(0, len(spans), task_size)]
+            columns = sorted({operand for condition in conditions for operand in (condition.left, condition.right)
+                              if not _is_number(operand)} | ({rank_by} if rank_by else set()))
+            with metrics.timer('screener_seconds', stage='indicators'):
+                # Spawned rather than forked: the app process runs threads that a fork would copy mid-flight
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)),
+                                         mp_context=multiprocessing.get_context('spawn'), initializer=_attach,
+                                         initargs=(block.name, total, self.indicator_registry)) as executor:
+                    results = [row for rows in executor.map(_screen_spans, tasks, [conditions] * len(tasks),
+                                                            [columns] * len(tasks)) for row in rows]
+        finally:
+            block.close()
+            block.unlink()
+
+        table = pd.DataFrame(results)
+        sort_column = rank_by or (f"strength: {conditions[0]}" if conditions else 'close')
+        return table.sort_values(['passed', sort_column], ascending=False, na_position='last').reset_index(drop=True)
+
+    def load(self, symbols: list, timeframe: str, limit: int, market_type: str) -> dict:
+        """
+        Fetches the last 'limit' closed candles of every symbol; symbols that fail are logged and
+        left out.
+        """
+        now = self.fetcher.now()
+        step = self.fetcher.delta_calculator.calculate_delta(timeframe, 1)
+        # The candle containing 'now' is still forming; the window ends with the one before it
+        start, end = self.fetcher.window_bounds(timeframe, limit + 1, now - step)
+
+        def fetch(symbol):
+            data = self.fetcher.fetch_ohlcv_range(symbol, timeframe, start, end, timezone.utc, market_type)
+            if not data.empty:
+                data = data[data['date'] <= now - step]
+            return data.tail(limit)
+
+        candles = {}
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            futures = {symbol: executor.submit(fetch, symbol) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logger.warning("Skipping %s: %s", symbol, e)
+                    continue
+                if not data.empty:
+                    candles[symbol] = data
+        return candles
+
+
+def _views(block: shared_memory.SharedMemory, total: int):
+    dates = np.ndarray((total,), dtype=np.int64, buffer=block.buf)
+    values = np.ndarray((len(VALUE_COLUMNS), total), dtype=np.float64, buffer=block.buf, offset=total * 8)
+    return dates, values
+
+def _is_number(operand: str) -> bool:
+    try:
+        float(operand)
+        return True
+    except ValueError:
+        return False
+
+_worker = {}
+
+def _attach(name: str, total: int, indicator_registry: IndicatorRegistry):
+    # Pool workers share the parent's resource tracker, so attaching does not hand them the unlink
+    block = shared_memory.SharedMemory(name=name)
+    _worker.update(block=block, views=_views(block, total), registry=indicator_registry)
+
+def _screen_spans(spans: list, conditions: list, columns: list) -> list:
+    dates, values = _worker['views']
+    rows = []
+    for symbol, start, stop in spans:
+        candles = pd.DataFrame({'date': dates[start:stop],
+                                **{col: values[i, start:stop] for i, col in enumerate(VALUE_COLUMNS)}}, copy=False)
+        indicators, _ = _worker['registry'].calculate_all(candles)
+        available = {**{col: candles[col].to_numpy() for col in VALUE_COLUMNS},
+                     **{col: indicators[col].to_numpy(dtype=float) for col in indicators.columns}}
+        row = {'symbol': symbol, 'close': float(values[VALUE_COLUMNS.index('close'), stop - 1]), 'passed': True}
+        for col in columns:
+            if col not in available:
+                raise ValueError(f"Unknown column '{col}'. Available columns: {', '.join(available)}")
+            row[col] = float(available[col][-1])
+        for condition in conditions:
+            passed, strength = condition.evaluate(available)
+            row['passed'] = row['passed'] and passed
+            row[f"strength: {condition}"] = strength
+        rows.append(row)
+    return rows
@@ -1,5 +1,6 @@
+import math
 import re
-from datetime import timedelta
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import streamlit as st
 
@@ -35,3 +36,33 @@ class TimeframeDeltaCalculator:
         except Exception as e:
             st.error(f"An error occurred during delta calculation: {e}")
             return timedelta(0)
+
+    def count_candles(self, timeframe: str, start: datetime, end: datetime) -> int:
+        width = ((start + self.calculate_delta(timeframe, 1)) - start).total_seconds()
+        if width <= 0 or end <= start:
+            return 0
+        count = math.ceil((end - start).total_seconds() / width)
+        # Calendar months differ in length, so the estimate is corrected against the actual candle opens
+        while count > 0 and start + self.calculate_delta(timeframe, count - 1) >= end:
+            count -= 1
+        while start + self.calculate_delta(timeframe, count) < end:
+            count += 1
+        return count
+
+    def plan_batches(self, timeframe: str, start: datetime, end: datetime, batch_size: int) -> list:
+        """
+        Splits [start, end) into consecutive windows holding at most batch_size candles each,
+        returned as (window_start, window_end, candle_count) tuples.
+        """
+        batches = []
+        window_start = start
+        offset = 0
+        while window_start < end:
+            offset += batch_size
+            window_end = min(start + self.calculate_delta(timeframe, offset), end)
+            if window_end <= window_start:
+                break
+            candle_count = min(batch_size, max(1, self.count_candles(timeframe, window_start, window_end)))
+            batches.append((window_start, window_end, candle_count))
+            window_start = window_end
+        return batches
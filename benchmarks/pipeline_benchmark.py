@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import streamlit.logger  # noqa: E402
+from streamlit import config as streamlit_config  # noqa: E402
+from app.timeframe_delta_calculator import TimeframeDeltaCalculator  # noqa: E402
+from app.market_data_fetcher import MarketDataFetcher  # noqa: E402
+from app.fake_exchange import FakeExchange  # noqa: E402
+from app.indicators import IndicatorRegistry, EmaIndicator, MacdIndicator  # noqa: E402
+from app.data_saver import CsvSaver  # noqa: E402
+from app.chart_renderer import ChartRenderer  # noqa: E402
+from app.crypto_data_app import CryptoDataApp  # noqa: E402
+
+SYMBOL = 'BTC/USDT'
+NOW_MS = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+DEFAULT_RESULTS = os.path.join(ROOT, 'benchmarks', 'results', 'pipeline.jsonl')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time each stage of the fetch -> indicators -> trim -> save -> chart "
+                                                 "pipeline against a deterministic fake exchange.")
+    parser.add_argument("--sizes", default="1000,100000,10000000", help="Comma-separated candle counts")
+    parser.add_argument("--timeframe", default="1m", help="Timeframe of the generated candles")
+    parser.add_argument("--page-size", type=int, default=1000, help="Candles the fake exchange returns per request")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated round trip per request")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requests per second before the fake exchange "
+                                                                      "answers with RateLimitExceeded")
+    parser.add_argument("--exchange-id", default="fake", help="Exchange id the fake reports, which selects the "
+                                                              "concurrency cap from MAX_CONCURRENT_REQUESTS")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass that measures peak memory")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSONL file the results are appended to")
+    return parser.parse_args()
+
+def build_stages(args, size: int, output_path: str) -> list:
+    """
+    Returns (name, function) pairs; each function takes the previous stage's output.
+    """
+    exchange = FakeExchange(exchange_id=args.exchange_id, now_ms=NOW_MS, page_size=args.page_size,
+                            latency=args.latency_ms / 1000, max_requests_per_second=args.rate_limit)
+    fetcher = MarketDataFetcher(exchange, TimeframeDeltaCalculator())
+    indicator_registry = IndicatorRegistry()
+    indicator_registry.register('ema_10', EmaIndicator(10))
+    indicator_registry.register('ema_20', EmaIndicator(20))
+    indicator_registry.register('macd', MacdIndicator())
+    chart_renderer = ChartRenderer()
+    saver = CsvSaver()
+    app = CryptoDataApp(None, chart_renderer, saver)
+    app.limit = size
+
+    # The last candle opens one candle before NOW_MS, so every candle is closed
+    selected_datetime = datetime.fromtimestamp(NOW_MS / 1000, timezone.utc) - \
+        fetcher.delta_calculator.calculate_delta(args.timeframe, 1)
+
+    def fetch(_):
+        data = fetcher.fetch_ohlcv(SYMBOL, args.timeframe, size, selected_datetime, ZoneInfo('UTC'), 'spot')
+        if data.empty:
+            raise RuntimeError("The fetch returned no candles")
+        return data
+
+    def indicators(data):
+        columns, _ = indicator_registry.calculate_all(data, len(data) - 1)
+        return data, columns
+
+    def trim(inputs):
+        return app.trim_data(*inputs)
+
+    def save(data):
+        saver.save(data, output_path)
+        return data
+
+    def chart(data):
+        import streamlit as st
+        # The pyramid is cached per session; drop it so every pass builds it
+        st.session_state.pop('chart_pyramid', None)
+        chart_renderer.display_chart(data, SYMBOL)
+        return data
+
+    return [('fetch', fetch), ('indicators', indicators), ('trim', trim), ('save', save), ('chart', chart)]
+
+def run_size(args, size: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stages = build_stages(args, size, os.path.join(tmp_dir, 'candles.csv'))
+        value = None
+        for name, stage in stages:
+            result = {'size': size, 'stage': name, 'rows': None, 'seconds': None, 'candles_per_sec': None,
+                      'peak_bytes': None, 'error': None}
+            results.append(result)
+            try:
+                start = time.perf_counter()
+                output = stage(value)
+                result['seconds'] = time.perf_counter() - start
+                result['rows'] = len(output[0] if isinstance(output, tuple) else output)
+                result['candles_per_sec'] = result['rows'] / result['seconds'] if result['seconds'] > 0 else None
+                if result['rows'] < size:
+                    raise RuntimeError(f"Returned {result['rows']} of {size} candles")
+
+                # Tracing slows Python down, so peak memory comes from a second pass over the same input
+                if not args.no_memory:
+                    tracemalloc.start()
+                    stage(value)
+                    result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                value = output
+            except Exception as e:
+                if tracemalloc.is_tracing():
+                    tracemalloc.stop()
+                result['error'] = f"{type(e).__name__}: {e}"
+                break
+    return results
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=ROOT).stdout.strip()
+    except Exception:
+        return None
+
+COMPARED_SETTINGS = ('timeframe', 'page_size', 'latency_ms', 'rate_limit', 'exchange_id')
+
+def result_key(record: dict) -> tuple:
+    return (record['size'], record['stage']) + tuple(record[setting] for setting in COMPARED_SETTINGS)
+
+def load_previous(path: str) -> dict:
+    # Latest stored result per size, stage and fake exchange settings
+    previous = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    previous[result_key(record)] = record
+    return previous
+
+def format_change(current, before) -> str:
+    if current is None or not before:
+        return ''
+    return f"{(current - before) / before * 100:+.0f}%"
+
+def main():
+    args = parse_args()
+    # Streamlit runs bare here and would warn on every call that needs a session
+    streamlit_config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    previous = load_previous(args.results)
+    run = {
+        'run_id': datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'timeframe': args.timeframe,
+        'page_size': args.page_size,
+        'latency_ms': args.latency_ms,
+        'rate_limit': args.rate_limit,
+        'exchange_id': args.exchange_id
+    }
+
+    # Imports and first-call setup are paid here instead of by the first measured size
+    run_size(argparse.Namespace(**{**vars(args), 'no_memory': True}), 1000)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    print(f"{'size':>10} {'stage':<11} {'rows':>10} {'seconds':>9} {'candles/s':>12} {'peak MB':>9} {'vs last':>8}")
+    failed = False
+    for size in sizes:
+        for result in run_size(args, size):
+            record = {**run, **result}
+            with open(args.results, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+            before = previous.get(result_key(record))
+            if result['error']:
+                failed = True
+                print(f"{size:>10} {result['stage']:<11} failed: {result['error']}")
+                continue
+            peak = f"{result['peak_bytes'] / 1024 ** 2:.1f}" if result['peak_bytes'] is not None else '-'
+            change = format_change(result['seconds'], before and before.get('seconds'))
+            print(f"{size:>10} {result['stage']:<11} {result['rows']:>10} {result['seconds']:>9.3f} "
+                  f"{result['candles_per_sec']:>12,.0f} {peak:>9} {change:>8}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
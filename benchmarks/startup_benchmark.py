@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_SCRIPT = os.path.join(ROOT, 'main.py')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time the Streamlit app's cold start and widget reruns.")
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold starts, each in a fresh interpreter")
+    parser.add_argument("--reruns", type=int, default=20, help="Number of reruns timed after each cold start")
+    parser.add_argument("--max-cold-ms", type=float, default=None, help="Fail if the median cold start is slower")
+    parser.add_argument("--max-rerun-ms", type=float, default=None, help="Fail if the median rerun is slower")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def measure(reruns: int) -> dict:
+    """
+    Runs the app script headless with Streamlit's AppTest: once from a cold interpreter, then
+    'reruns' more times, which is what every widget interaction costs.
+    """
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import config  # noqa: F401
+    config_ms = (time.perf_counter() - start) * 1000
+
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(APP_SCRIPT, default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first_run_ms = (time.perf_counter() - start) * 1000
+    if app.exception:
+        raise RuntimeError(f"The app raised during the first run: {app.exception[0].value}")
+
+    rerun_ms = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        rerun_ms.append((time.perf_counter() - start) * 1000)
+    return {'config_import_ms': config_ms, 'first_run_ms': first_run_ms, 'rerun_ms': rerun_ms}
+
+def main():
+    args = parse_args()
+    if args.child:
+        print(json.dumps(measure(args.reruns)))
+        return 0
+
+    results = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--reruns", str(args.reruns)],
+                                capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['cold_ms'] = (time.perf_counter() - start) * 1000
+        results.append(result)
+
+    cold_ms = statistics.median(result['cold_ms'] for result in results)
+    rerun_ms = statistics.median(ms for result in results for ms in result['rerun_ms'])
+    summary = {
+        'cold_start_ms': round(cold_ms, 1),
+        'config_import_ms': round(statistics.median(result['config_import_ms'] for result in results), 1),
+        'first_run_ms': round(statistics.median(result['first_run_ms'] for result in results), 1),
+        'rerun_ms': round(rerun_ms, 2),
+        'rerun_p95_ms': round(statistics.quantiles([ms for result in results for ms in result['rerun_ms']], n=20)[-1], 2)
+                        if args.reruns > 1 else round(rerun_ms, 2)
+    }
+    print(json.dumps(summary, indent=2))
+
+    failed = False
+    if args.max_cold_ms is not None and cold_ms > args.max_cold_ms:
+        print(f"Cold start {cold_ms:.0f} ms exceeds the {args.max_cold_ms:.0f} ms budget", file=sys.stderr)
+        failed = True
+    if args.max_rerun_ms is not None and rerun_ms > args.max_rerun_ms:
+        print(f"Rerun {rerun_ms:.1f} ms exceeds the {args.max_rerun_ms:.1f} ms budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
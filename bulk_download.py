@@ -0,0 +1,61 @@
+import argparse
+import logging
+import os
+from config import SUPPORTED_EXCHANGES, CANDLE_STORE_DIRECTORY, SAVE_DIRECTORY
+from app.exchange_factory import exchange_factory
+from app.market_catalog import market_catalog
+from app.timeframe_delta_calculator import TimeframeDeltaCalculator
+from app.market_data_fetcher import MarketDataFetcher
+from app.candle_store import CandleStore
+from app.data_saver import CsvSaver, ParquetSaver, FeatherSaver, DatasetSaver
+from app.bulk_downloader import BulkDownloader
+from app.metrics import metrics
+
+SAVERS = {
+    'csv': CsvSaver,
+    'parquet': ParquetSaver,
+    'feather': FeatherSaver,
+    'dataset': DatasetSaver
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download OHLCV data for many symbols and timeframes without the UI.")
+    parser.add_argument("manifest", help="JSON manifest listing exchanges, symbols, timeframes and date ranges")
+    parser.add_argument("--output", default=SAVE_DIRECTORY, help="Directory the downloaded files are written to")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint file used to resume an interrupted run (default: <output>/bulk_checkpoint.json)")
+    parser.add_argument("--format", choices=list(SAVERS), default='csv', help="File format of the downloaded data")
+    parser.add_argument("--workers", type=int, default=8, help="Number of jobs downloaded at the same time")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write timings and request counts in the Prometheus text format to this file when done")
+    parser.add_argument("--log-metrics", action="store_true",
+                        help="Log every timing and counter update as a JSON line")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.log_metrics:
+        logging.getLogger('app.metrics').setLevel(logging.DEBUG)
+
+    jobs = BulkDownloader.load_manifest(args.manifest)
+
+    # Setup dependencies, creating only the exchanges the manifest uses
+    delta_calculator = TimeframeDeltaCalculator()
+    candle_store = CandleStore(CANDLE_STORE_DIRECTORY)
+    fetchers = {
+        name: MarketDataFetcher(exchange_factory.get(name), delta_calculator, candle_store, market_catalog)
+        for name in SUPPORTED_EXCHANGES if any(job.exchange == name for job in jobs)
+    }
+
+    checkpoint_path = args.checkpoint or os.path.join(args.output, 'bulk_checkpoint.json')
+    downloader = BulkDownloader(fetchers, SAVERS[args.format](), args.output, checkpoint_path, args.workers)
+    summary = downloader.run(jobs)
+    logging.info("Done: %(completed)d completed, %(skipped)d skipped, %(failed)d failed", summary)
+    if args.metrics_file:
+        with open(args.metrics_file, 'w') as f:
+            f.write(metrics.to_prometheus())
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,5 @@
-import ccxt
-
-SUPPORTED_EXCHANGES = {
-    "binance": ccxt.binance(),
-    "bybit": ccxt.bybit()
-}
+# ccxt exchange ids; instances are created on first use by app.exchange_factory
+SUPPORTED_EXCHANGES = ["binance", "bybit"]
 
 SUPPORTED_TIMEFRAMES = {
     "binance": [
@@ -19,7 +15,43 @@ SUPPORTED_TIMEFRAMES = {
 }
 
 EXTRA_CANDLES = 100
+LIVE_TAIL_INTERVAL_SECONDS = 10
+OHLCV_BATCH_SIZE = 500  # Maximum number of candles per request
+CANDLE_DTYPE = 'float64'  # 'float32' halves the memory of fetched prices at about 7 significant digits
+
+# Upper bound on simultaneous OHLCV requests per exchange, shared by every fetch in the process
+MAX_CONCURRENT_REQUESTS = {
+    "binance": 5,
+    "bybit": 4
+}
+# Request weight budgets per exchange and endpoint, enforced by app.request_scheduler. Binance counts
+# 6000 weight per minute with klines costing 2; Bybit allows 10 kline requests per second per IP.
+RATE_LIMITS = {
+    "binance": {"ohlcv": {"capacity": 1000, "refill_per_second": 100, "weight": 2}},
+    "bybit": {"ohlcv": {"capacity": 10, "refill_per_second": 10, "weight": 1}}
+}
+RATE_LIMIT_BACKOFF_SECONDS = (1.0, 60.0)  # First and longest pause after the exchange pushes back
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_BACKGROUND_RESERVE = 0.5  # Share of each budget background requests leave to interactive ones
+
+# After a chart is shown, neighbouring windows and timeframes are fetched into the result cache
+PREFETCH_ENABLED = True
+PREFETCH_TIMEFRAME_NEIGHBOURS = 1  # Timeframes on each side of the selected one
 SAVE_DIRECTORY = 'saved_data'
+SAVED_DATA_CATALOG = 'saved_data/catalog.sqlite'  # Index over the files in SAVE_DIRECTORY, see app.saved_data_catalog
+CANDLE_STORE_DIRECTORY = 'candle_store'
+MARKET_CACHE_DIRECTORY = 'market_cache'
+MARKET_CACHE_TTL_SECONDS = 24 * 60 * 60  # Market listings are reloaded from the exchange once a day
+
+# In-memory cache of fetch and indicator results, shared by every session of the process
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESULT_CACHE_TTL_SECONDS = 60 * 60
+RESULT_CACHE_FORMING_TTL_SECONDS = 5  # Results ending in a still-open candle go stale quickly
 DEFAULT_TRADING_PAIR = 'BTCUSDT'
 DEFAULT_EXCHANGE = 'bybit'
 DEFAULT_MARKET_TYPE = 'perpetual'  # or 'spot' based on exchange
+
+# csv_view.py large-file mode
+LARGE_FILE_BYTES = 50 * 1024 * 1024  # Uploads above this size start in large-file mode
+MAX_CHART_BARS = 2000
+CSV_INDEX_CHUNK_ROWS = 100_000
@@ -1,15 +1,60 @@
 import streamlit as st
 import pandas as pd
 from lightweight_charts.widgets import StreamlitChart
+from config import LARGE_FILE_BYTES, MAX_CHART_BARS, CSV_INDEX_CHUNK_ROWS
+from app.data_loader import LOADERS, get_loader
+from app.csv_index import CsvTimeIndex
+from app.candle_aggregator import aggregate_chunks, downsample_factor
 
-# Function to load CSV data
+# Function to load saved data (CSV, Parquet or Feather)
 def load_csv():
-    uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type=["csv"], key="csv_upload")
+    uploaded_file = st.sidebar.file_uploader("Upload a data file", type=list(LOADERS), key="csv_upload")
     if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
+        is_csv = uploaded_file.name.lower().endswith('.csv')
+        if is_csv and st.sidebar.checkbox("Large-file mode", value=uploaded_file.size > LARGE_FILE_BYTES):
+            return load_large_csv(uploaded_file)
+        df = get_loader(uploaded_file.name).load(uploaded_file)
         return df
     return None
 
+# Function to load one date range of a large CSV, aggregated down to at most MAX_CHART_BARS bars
+def load_large_csv(uploaded_file):
+    file_key = (uploaded_file.name, uploaded_file.size)
+    if st.session_state.get('csv_index_key') != file_key:
+        with st.spinner("Indexing file..."):
+            st.session_state['csv_index'] = CsvTimeIndex.build(uploaded_file, CSV_INDEX_CHUNK_ROWS)
+        st.session_state['csv_index_key'] = file_key
+        st.session_state['csv_range_data'] = None
+    index = st.session_state['csv_index']
+    if index.first_date is None:
+        return None
+
+    selected_range = st.sidebar.date_input(
+        "Date Range",
+        value=(index.first_date.date(), index.last_date.date()),
+        min_value=index.first_date.date(),
+        max_value=index.last_date.date()
+    )
+    if len(selected_range) != 2:
+        st.sidebar.info("Select an end date.")
+        return None
+    start = pd.Timestamp(selected_range[0])
+    end = pd.Timestamp(selected_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+
+    # Reuse the aggregated range across reruns until the file or the range changes
+    range_key = (file_key, start, end)
+    cached = st.session_state.get('csv_range_data')
+    if cached is not None and cached[0] == range_key:
+        data, factor = cached[1], cached[2]
+    else:
+        factor = downsample_factor(index.estimate_rows(start, end), MAX_CHART_BARS)
+        chunks = list(aggregate_chunks(index.read_range(uploaded_file, start, end, CSV_INDEX_CHUNK_ROWS), factor))
+        data = pd.concat(chunks, ignore_index=True) if chunks else None
+        st.session_state['csv_range_data'] = (range_key, data, factor)
+
+    st.sidebar.caption(f"{index.row_count:,} rows indexed, showing one bar per {factor} candle(s).")
+    return data
+
 # Function to display chart
 def display_chart(data):
     if data is not None:
@@ -55,10 +100,10 @@ def main():
     # Load CSV data
     data = load_csv()
     if data is not None:
-        st.success("CSV file loaded successfully!")
+        st.success("Data file loaded successfully!")
         display_chart(data)
     else:
-        st.warning("Please upload a CSV file to display the data.")
+        st.warning("Please upload a data file to display the data.")
 
 if __name__ == "__main__":
     main()
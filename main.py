@@ -1,7 +1,12 @@
-from config import SUPPORTED_EXCHANGES
+from config import DEFAULT_EXCHANGE, CANDLE_STORE_DIRECTORY
+from app.exchange_factory import exchange_factory
+from app.market_catalog import market_catalog
+from app.result_cache import result_cache
+from app.prefetcher import prefetcher
 from app.timeframe_delta_calculator import TimeframeDeltaCalculator
 from app.market_data_fetcher import MarketDataFetcher
-from app.data_saver import CsvSaver
+from app.candle_store import CandleStore
+from app.data_saver import CsvSaver, ParquetSaver, FeatherSaver, DatasetSaver
 from app.indicators import IndicatorRegistry, EmaIndicator, MacdIndicator
 from app.crypto_data_facade import CryptoDataFacade
 from app.chart_renderer import ChartRenderer
@@ -9,11 +14,11 @@ from app.crypto_data_app import CryptoDataApp
 
 def main():
     # Setup dependencies
-    exchange_name = "bybit"  # Default, can be changed if needed
-    exchange = SUPPORTED_EXCHANGES[exchange_name]
+    exchange = exchange_factory.get(DEFAULT_EXCHANGE)  # Created once per process, reused on every rerun
 
     delta_calculator = TimeframeDeltaCalculator()
-    fetcher = MarketDataFetcher(exchange, delta_calculator)
+    candle_store = CandleStore(CANDLE_STORE_DIRECTORY)
+    fetcher = MarketDataFetcher(exchange, delta_calculator, candle_store, market_catalog)
 
     # Setup indicators
     indicator_registry = IndicatorRegistry()
@@ -21,11 +26,17 @@ def main():
     indicator_registry.register('ema_20', EmaIndicator(20))
     indicator_registry.register('macd', MacdIndicator())
 
-    facade = CryptoDataFacade(fetcher, indicator_registry)
+    facade = CryptoDataFacade(fetcher, indicator_registry, result_cache)
     chart_renderer = ChartRenderer()
     saver = CsvSaver()
+    savers = {
+        'csv': saver,
+        'parquet': ParquetSaver(),
+        'feather': FeatherSaver(),
+        'dataset': DatasetSaver()
+    }
 
-    app = CryptoDataApp(facade, chart_renderer, saver)
+    app = CryptoDataApp(facade, chart_renderer, saver, savers, prefetcher)
     app.display()
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+import argparse
+import logging
+import os
+from config import SAVE_DIRECTORY, SAVED_DATA_CATALOG, CSV_INDEX_CHUNK_ROWS
+from app.saved_data_catalog import SavedDataCatalog
+from app.data_saver import CsvSaver, ParquetSaver, FeatherSaver
+
+SAVERS = {
+    'csv': CsvSaver,
+    'parquet': ParquetSaver,
+    'feather': FeatherSaver
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List saved datasets, or combine the saved candles of one symbol and "
+                                                 "timeframe within a date range into a single file.")
+    parser.add_argument("symbol", nargs="?", help="Symbol in any spelling, e.g. BTCUSDT or BTC/USDT")
+    parser.add_argument("timeframe", nargs="?", help="Timeframe, e.g. 1h")
+    parser.add_argument("start", nargs="?", help="First candle time, e.g. 2024-03-01")
+    parser.add_argument("end", nargs="?", help="Last candle time, e.g. '2024-03-31 23:59'")
+    parser.add_argument("--exchange", default=None, help="Only use files from this exchange")
+    parser.add_argument("--market-type", default=None, help="Only use files of this market type")
+    parser.add_argument("--timezone", default=None, help="Only use files saved in this timezone")
+    parser.add_argument("--directory", default=SAVE_DIRECTORY, help="Directory the saved files are in")
+    parser.add_argument("--output", default=None, help="Write the combined candles to this .csv, .parquet or "
+                                                       ".feather file instead of printing a summary")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    index_path = SAVED_DATA_CATALOG if args.directory == SAVE_DIRECTORY else os.path.join(args.directory, 'catalog.sqlite')
+    catalog = SavedDataCatalog(args.directory, index_path, CSV_INDEX_CHUNK_ROWS)
+
+    if args.end is None:
+        print(catalog.datasets().to_string(index=False))
+        return 0
+
+    data = catalog.query(args.symbol, args.timeframe, args.start, args.end, args.exchange, args.market_type,
+                         args.timezone)
+    if data.empty:
+        logging.error("No saved candles for %s %s between %s and %s.", args.symbol, args.timeframe, args.start, args.end)
+        return 1
+    if args.output:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        if extension not in SAVERS:
+            logging.error("Unsupported output format '%s', use one of: %s.", extension, ', '.join(SAVERS))
+            return 1
+        SAVERS[extension]().save(data, args.output)
+        logging.info("Wrote %d candles to %s", len(data), args.output)
+    else:
+        print(f"{len(data)} candles from {data['date'].iloc[0]} to {data['date'].iloc[-1]}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+import argparse
+import logging
+from config import SUPPORTED_EXCHANGES, SUPPORTED_TIMEFRAMES, CANDLE_STORE_DIRECTORY
+from app.exchange_factory import exchange_factory
+from app.market_catalog import market_catalog
+from app.timeframe_delta_calculator import TimeframeDeltaCalculator
+from app.market_data_fetcher import MarketDataFetcher
+from app.candle_store import CandleStore
+from app.indicators import IndicatorRegistry, EmaIndicator, MacdIndicator
+from app.screener import Screener, Condition
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Screen many symbols for conditions on the registered indicators, "
+                                                 "e.g. --condition 'ema_10 crosses above ema_20'.")
+    parser.add_argument("--exchange", choices=SUPPORTED_EXCHANGES, default="bybit")
+    parser.add_argument("--market-type", choices=["spot", "perpetual"], default="spot")
+    parser.add_argument("--timeframe", default="4h")
+    parser.add_argument("--symbols", default=None, help="Comma-separated symbols (default: every active market "
+                                                        "quoted in --quote)")
+    parser.add_argument("--quote", default="USDT", help="Quote currency of the markets screened without --symbols")
+    parser.add_argument("--condition", action="append", default=[],
+                        help="Condition every listed symbol must meet, repeatable. Operands are open, high, low, close, "
+                             "volume, indicator columns (ema_10, ema_20, macd) or numbers; operators are >, <, >=, <=, "
+                             "'crosses above' and 'crosses below'")
+    parser.add_argument("--rank-by", default=None, help="Column to rank passing symbols by (default: the strength "
+                                                        "of the first condition)")
+    parser.add_argument("--candles", type=int, default=300, help="Closed candles loaded per symbol")
+    parser.add_argument("--workers", type=int, default=None, help="Indicator processes (default: one per core)")
+    parser.add_argument("--top", type=int, default=20, help="Number of passing symbols printed")
+    parser.add_argument("--output", default=None, help="Also write the full table, failing symbols included, to this CSV")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.timeframe not in SUPPORTED_TIMEFRAMES[args.exchange]:
+        logging.error("Timeframe %s is not supported on %s.", args.timeframe, args.exchange)
+        return 1
+    try:
+        conditions = [Condition.parse(condition) for condition in args.condition]
+    except ValueError as e:
+        logging.error("%s", e)
+        return 1
+
+    # Setup dependencies
+    exchange = exchange_factory.get(args.exchange)
+    fetcher = MarketDataFetcher(exchange, TimeframeDeltaCalculator(), CandleStore(CANDLE_STORE_DIRECTORY), market_catalog)
+    indicator_registry = IndicatorRegistry()
+    indicator_registry.register('ema_10', EmaIndicator(10))
+    indicator_registry.register('ema_20', EmaIndicator(20))
+    indicator_registry.register('macd', MacdIndicator())
+
+    if args.symbols:
+        symbols = [symbol.strip() for symbol in args.symbols.split(',') if symbol.strip()]
+    else:
+        symbols = market_catalog.symbols(exchange, args.market_type, args.quote)
+    logging.info("Screening %d %s %s markets on %s", len(symbols), args.exchange, args.market_type, args.timeframe)
+
+    screener = Screener(fetcher, indicator_registry, args.workers)
+    try:
+        table = screener.screen(symbols, args.timeframe, args.candles, args.market_type, conditions, args.rank_by)
+    except ValueError as e:
+        logging.error("%s", e)
+        return 1
+    if table.empty:
+        logging.error("No candles could be loaded for the requested symbols.")
+        return 1
+    if args.output:
+        table.to_csv(args.output, index=False)
+
+    passed = table[table['passed']]
+    logging.info("%d of %d symbols meet every condition", len(passed), len(table))
+    if not passed.empty:
+        print(passed.head(args.top).drop(columns='passed').to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
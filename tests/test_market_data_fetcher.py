@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from app.candle_store import CandleStore
+from app.fake_exchange import FakeExchange
+from app.market_data_fetcher import MarketDataFetcher
+from app.request_scheduler import RequestScheduler
+from app.timeframe_delta_calculator import TimeframeDeltaCalculator
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+NOW_MS = int(datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+def _fetcher(exchange: FakeExchange, candle_store: CandleStore = None) -> MarketDataFetcher:
+    scheduler = RequestScheduler({}, {exchange.id: 4})
+    return MarketDataFetcher(exchange, TimeframeDeltaCalculator(), candle_store, request_scheduler=scheduler)
+
+def _check_candles(data, exchange: FakeExchange, count: int):
+    opens = data['date'].dt.tz_convert(None).to_numpy().astype('datetime64[ms]').astype(np.int64)
+    assert len(data) == count
+    assert opens[0] == int(START.timestamp() * 1000)
+    assert (np.diff(opens) == 60_000).all()
+    np.testing.assert_array_equal(data['open'].to_numpy(), exchange._price(opens))
+    np.testing.assert_array_equal(data['close'].to_numpy(), exchange._price(opens + 60_000))
+
+@pytest.mark.parametrize('with_store', [False, True])
+def test_fetch_range_pages_through_the_fake_exchange(tmp_path, with_store):
+    exchange = FakeExchange(now_ms=NOW_MS, page_size=200)
+    store = CandleStore(str(tmp_path)) if with_store else None
+    data = _fetcher(exchange, store).fetch_ohlcv_range('BTC/USDT', '1m', START, START + timedelta(minutes=1000),
+                                                        timezone.utc, 'spot')
+
+    _check_candles(data, exchange, 1000)
+    # Paged in requests of at most the exchange's page size
+    assert len(exchange.requests) >= 1000 // 200
+    assert str(data['date'].dt.tz) == 'UTC'
+
+def test_stored_candles_are_not_fetched_again(tmp_path):
+    exchange = FakeExchange(now_ms=NOW_MS, page_size=200)
+    fetcher = _fetcher(exchange, CandleStore(str(tmp_path)))
+    first = fetcher.fetch_ohlcv_range('BTC/USDT', '1m', START, START + timedelta(minutes=600), timezone.utc, 'spot')
+    requests = len(exchange.requests)
+
+    data = fetcher.fetch_ohlcv_range('BTC/USDT', '1m', START, START + timedelta(minutes=1000), timezone.utc, 'spot')
+    _check_candles(data, exchange, 1000)
+    assert first.equals(data.head(600))
+    # Only the 400 minutes missing from the store are requested
+    stored_end = int(START.timestamp() * 1000) + 600 * 60_000
+    assert all(request['since'] >= stored_end for request in exchange.requests[requests:])
+    assert len(exchange.requests) > requests
+
+def test_forming_candle_follows_the_clock(tmp_path):
+    exchange = FakeExchange(now_ms=NOW_MS - 30_000, page_size=200)
+    fetcher = _fetcher(exchange, CandleStore(str(tmp_path)))
+    end = datetime.fromtimestamp(NOW_MS / 1000, timezone.utc)
+    first = fetcher.fetch_ohlcv_range('BTC/USDT', '1m', end - timedelta(minutes=10), end, timezone.utc, 'spot')
+    assert first['close'].iloc[-1] == exchange._price(np.array([NOW_MS - 30_000]))[0]
+
+    exchange.advance(20_000)
+    data = fetcher.fetch_ohlcv_range('BTC/USDT', '1m', end - timedelta(minutes=10), end, timezone.utc, 'spot')
+    assert len(data) == 10
+    # The still-forming candle is never taken from the store
+    assert data['close'].iloc[-1] == exchange._price(np.array([NOW_MS - 10_000]))[0]
+    assert data.head(9).equals(first.head(9))
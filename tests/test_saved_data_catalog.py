@@ -0,0 +1,43 @@
+import os
+import pandas as pd
+from app.data_saver import CsvSaver, safe_symbol
+from app.saved_data_catalog import SavedDataCatalog
+
+def _candles(start: str, periods: int) -> pd.DataFrame:
+    dates = pd.date_range(start, periods=periods, freq='h')
+    close = [float(i) for i in range(periods)]
+    return pd.DataFrame({'date': dates, 'open': close, 'high': close, 'low': close, 'close': close,
+                         'volume': close})
+
+def _save_csv(directory, data: pd.DataFrame, symbol: str, timezone: str = 'UTC') -> str:
+    # Named the way the app names it: BTC/USDT -> BTC_USDT_1h_<date>_<time>.csv
+    last = data['date'].iloc[-1]
+    filename = f"{safe_symbol(symbol)}_1h_{last:%Y-%m-%d}_{last:%H-%M-%S}.csv"
+    metadata = {'exchange': 'binance', 'market_type': 'spot', 'symbol': symbol, 'timeframe': '1h',
+                'timezone': timezone}
+    path = os.path.join(directory, filename)
+    CsvSaver().save(data, path, metadata)
+    return path
+
+def test_csv_symbol_with_separator_comes_from_its_metadata(tmp_path):
+    _save_csv(tmp_path, _candles('2024-03-01', 48), 'BTC/USDT')
+    catalog = SavedDataCatalog(str(tmp_path), str(tmp_path / 'catalog.sqlite'))
+
+    datasets = catalog.datasets()
+    assert datasets['symbol'].tolist() == ['BTC/USDT']
+    assert datasets['timezone'].tolist() == ['UTC']
+
+    for symbol in ('BTC/USDT', 'BTCUSDT'):
+        data = catalog.query(symbol, '1h', '2024-03-01', '2024-03-01 23:00')
+        assert len(data) == 24
+    assert catalog.query('USDT', '1h', '2024-03-01', '2024-03-01 23:00').empty
+
+def test_timezone_filter_skips_files_without_a_recorded_timezone(tmp_path):
+    _save_csv(tmp_path, _candles('2024-03-01', 24), 'BTC/USDT', timezone='Europe/Berlin')
+    unknown = tmp_path / 'BTCUSDT_1h_2024-03-02_23-00-00.csv'
+    _candles('2024-03-02', 24).to_csv(unknown, index=False)
+    catalog = SavedDataCatalog(str(tmp_path), str(tmp_path / 'catalog.sqlite'))
+
+    data = catalog.query('BTCUSDT', '1h', '2024-03-01', '2024-03-03', timezone='Europe/Berlin')
+    assert data['date'].max() == pd.Timestamp('2024-03-01 23:00')
+    assert len(catalog.query('BTCUSDT', '1h', '2024-03-01', '2024-03-03')) == 48